@@ -0,0 +1,188 @@
+import asyncio, time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+from core.logs import log
+from core.recheme import RechemeAPI
+from core.blrec import BLRECAPI
+from core.state import RoomStateStore
+from core.roominfo import room_id_of
+from core.webhooks import patch_room
+
+logger = log()
+
+RecorderKey = Tuple[str, str, str]
+
+class RecorderSnapshot:
+    """录播机最近一次成功获取的直播间列表"""
+
+    def __init__(self, rooms: List[Dict]):
+        self.rooms = rooms
+        self.updated_at = datetime.now()
+        self.fetched_at = time.monotonic()
+        self.stale = False
+        self.error = None
+
+class RoomAggregator:
+    """汇总各录播机的直播间列表，录播机不可用时继续提供最近一次成功获取的数据"""
+
+    def __init__(self, state_store: RoomStateStore, refresh_interval: float = 2):
+        """
+        初始化直播间汇总
+        :param state_store: 直播间状态汇总
+        :param refresh_interval: 直播间列表缓存时间(秒)，超过后重新获取
+        """
+        self.state_store = state_store
+        self.refresh_interval = refresh_interval
+        self._snapshots: Dict[RecorderKey, RecorderSnapshot] = {}
+        self._refreshing: Dict[RecorderKey, asyncio.Task] = {}
+
+    @staticmethod
+    def _key(client: Union[RechemeAPI, BLRECAPI]) -> RecorderKey:
+        return (client.rec_type, client.name, client.host)
+
+    async def refresh(self, client: Union[RechemeAPI, BLRECAPI]) -> Optional[RecorderSnapshot]:
+        """
+        从录播机获取直播间列表并更新快照
+        :return: 最新快照，获取失败且没有历史数据时返回 None
+        """
+        key = self._key(client)
+        rooms = await asyncio.to_thread(client.fetch_rooms)
+        snapshot = self._snapshots.get(key)
+
+        if rooms is None:
+            if snapshot is not None:
+                if not snapshot.stale:
+                    logger.warning(f"[汇总] {client.name} 无法访问，使用 {snapshot.updated_at:%H:%M:%S} 的数据")
+                snapshot.stale = True
+                snapshot.error = "录播机无法访问"
+            return snapshot
+
+        if snapshot is not None and snapshot.stale:
+            logger.info(f"[汇总] {client.name} 已恢复")
+        snapshot = RecorderSnapshot(rooms)
+        self._snapshots[key] = snapshot
+        self.state_store.update_recorder(client.rec_type, client.name, client.host, rooms)
+        return snapshot
+
+    def _refresh_in_background(self, client: Union[RechemeAPI, BLRECAPI]):
+        """后台刷新，同一录播机同时只有一个刷新任务"""
+        key = self._key(client)
+        task = self._refreshing.get(key)
+        if task is not None and not task.done():
+            return
+        task = asyncio.create_task(self.refresh(client))
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+        self._refreshing[key] = task
+
+    async def get_snapshot(self, client: Union[RechemeAPI, BLRECAPI]) -> Optional[RecorderSnapshot]:
+        """
+        获取录播机的直播间快照
+        数据未过期时直接返回；录播机已离线时返回旧数据并在后台刷新；否则重新获取
+        """
+        snapshot = self._snapshots.get(self._key(client))
+        if snapshot is not None:
+            if snapshot.stale:
+                self._refresh_in_background(client)
+                return snapshot
+            if time.monotonic() - snapshot.fetched_at < self.refresh_interval:
+                return snapshot
+        return await self.refresh(client)
+
+    async def get_snapshots(self, clients: List[Union[RechemeAPI, BLRECAPI]]) -> List[Tuple[Union[RechemeAPI, BLRECAPI], RecorderSnapshot]]:
+        """获取多个录播机的快照，跳过没有数据的录播机"""
+        snapshots = await asyncio.gather(*(self.get_snapshot(client) for client in clients))
+        return [(client, snapshot) for client, snapshot in zip(clients, snapshots) if snapshot is not None]
+
+    async def get_rooms(self, clients: List[Union[RechemeAPI, BLRECAPI]]) -> List[Dict]:
+        """
+        获取多个录播机的直播间列表
+        每个直播间的 recServer 中附带 recStale (是否为旧数据) 和 recUpdatedAt (数据获取时间)
+        """
+        rooms = []
+        for _, snapshot in await self.get_snapshots(clients):
+            updated_at = snapshot.updated_at.isoformat(timespec="seconds")
+            for room in snapshot.rooms:
+                rec_server = dict(room.get("recServer") or {}, recStale=snapshot.stale, recUpdatedAt=updated_at)
+                rooms.append(dict(room, recServer=rec_server))
+        return rooms
+
+    def invalidate(self, client: Union[RechemeAPI, BLRECAPI]):
+        """标记录播机的快照已过期，下次获取时重新请求"""
+        snapshot = self._snapshots.get(self._key(client))
+        if snapshot is not None:
+            snapshot.fetched_at = 0
+
+    def update_room(self, client: Union[RechemeAPI, BLRECAPI], room: Dict):
+        """使用单独获取的直播间数据更新快照与状态汇总"""
+        room_id = room_id_of(room)
+        snapshot = self._snapshots.get(self._key(client))
+        if room_id is None or snapshot is None:
+            return
+        room = dict(room, recServer=next(
+            (item.get("recServer") for item in snapshot.rooms if room_id_of(item) == room_id and item.get("recServer")),
+            room.get("recServer")
+        ))
+        snapshot.rooms = [room if room_id_of(item) == room_id else item for item in snapshot.rooms]
+        self.state_store.update_room(client.rec_type, client.name, client.host, room)
+
+    def apply_event(self, rec_type: str, rec_name: str, room_id: int, fields: Dict) -> int:
+        """
+        将录播机推送的状态变化写入快照与状态汇总，不请求录播机
+        :param fields: live / recording / title / name
+        :return: 更新的直播间数量，快照中没有该直播间时为 0
+        """
+        patched = 0
+        for key, snapshot in self._snapshots.items():
+            if key[0] != rec_type or key[1] != rec_name:
+                continue
+            rooms = list(snapshot.rooms)
+            for index, room in enumerate(rooms):
+                if room_id_of(room) == room_id:
+                    rooms[index] = patch_room(room, fields)
+                    self.state_store.update_room(rec_type, rec_name, key[2], rooms[index])
+                    patched += 1
+            snapshot.rooms = rooms
+        return patched
+
+    def export(self) -> List[Dict]:
+        """导出所有快照，用于保存到本地"""
+        return [
+            {
+                "recType": key[0],
+                "recName": key[1],
+                "recHost": key[2],
+                "updatedAt": snapshot.updated_at,
+                "rooms": snapshot.rooms
+            }
+            for key, snapshot in list(self._snapshots.items())
+        ]
+
+    def restore(self, recorders: List[Dict]):
+        """
+        从本地快照恢复，恢复的数据标记为旧数据，获取时在后台刷新
+        已有数据的录播机不覆盖
+        """
+        for item in recorders:
+            key = (item["recType"], item["recName"], item["recHost"])
+            if key in self._snapshots:
+                continue
+            snapshot = RecorderSnapshot(item["rooms"])
+            snapshot.updated_at = item["updatedAt"]
+            snapshot.fetched_at = 0
+            snapshot.stale = True
+            snapshot.error = "本地快照"
+            self._snapshots[key] = snapshot
+            self.state_store.update_recorder(item["recType"], item["recName"], item["recHost"], item["rooms"])
+
+    def is_online(self, rec_type: str, rec_name: str) -> bool:
+        """录播机最近一次获取直播间列表是否成功"""
+        return any(
+            not snapshot.stale
+            for key, snapshot in self._snapshots.items()
+            if key[0] == rec_type and key[1] == rec_name
+        )
+
+    def remove_recorder(self, rec_type: str, rec_name: str):
+        """移除录播机的快照"""
+        for key in [key for key in self._snapshots if key[0] == rec_type and key[1] == rec_name]:
+            del self._snapshots[key]
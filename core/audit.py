@@ -0,0 +1,210 @@
+import os, json, time, inspect, threading
+from collections import deque
+from datetime import datetime
+from functools import wraps
+from typing import Dict, List, Optional
+from fastapi import HTTPException
+from core.logs import log
+
+logger = log()
+
+class AuditJournal:
+    """操作审计日志，追加写入 JSON Lines 文件，由后台线程批量写入"""
+
+    def __init__(self, path: str = "data/audit.jsonl", flush_interval: float = 1, batch_size: int = 200,
+                 max_bytes: int = 10 * 1024 * 1024, backup_count: int = 10):
+        """
+        :param path: 审计日志文件路径
+        :param flush_interval: 写入间隔(秒)
+        :param batch_size: 积累到该数量时立即写入
+        :param max_bytes: 单个文件的最大大小(字节)，超过后轮转为 audit.jsonl.1 等，0 为不轮转
+        :param backup_count: 保留的历史文件数量
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.enabled = False
+        self._pending: List[Dict] = []
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._stopped = False
+        self._thread = None
+
+    def configure(self, options: Dict):
+        """
+        根据 AUDIT 配置启用审计日志
+        :param options: {"ENABLE": True, "PATH": "data/audit.jsonl", "FLUSH_INTERVAL": 1, "BATCH_SIZE": 200,
+                         "MAX_BYTES": 10485760, "BACKUP_COUNT": 10}
+        """
+        self.enabled = options.get("ENABLE", True)
+        self.path = options.get("PATH", self.path)
+        self.flush_interval = options.get("FLUSH_INTERVAL", self.flush_interval)
+        self.batch_size = options.get("BATCH_SIZE", self.batch_size)
+        self.max_bytes = options.get("MAX_BYTES", self.max_bytes)
+        self.backup_count = options.get("BACKUP_COUNT", self.backup_count)
+        if self.enabled and (self._thread is None or not self._thread.is_alive()):
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def record(self, user: Optional[str], action: str, success: bool, latency: float, recType: str = None,
+               recName: str = None, roomId: int = None, error: str = None):
+        """记录一次操作，只放入内存队列，不等待写入"""
+        if not self.enabled:
+            return
+        entry = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "user": user,
+            "action": action,
+            "recType": recType,
+            "recName": recName,
+            "roomId": roomId,
+            "success": success,
+            "latency": round(latency, 4),
+            "error": error
+        }
+        with self._condition:
+            self._pending.append({key: value for key, value in entry.items() if value is not None})
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopped and len(self._pending) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                stopped = self._stopped
+            self.flush()
+            if stopped:
+                break
+
+    def files(self) -> List[str]:
+        """所有审计日志文件，按时间从新到旧"""
+        paths = [self.path] + [f"{self.path}.{index}" for index in range(1, self.backup_count + 1)]
+        return [path for path in paths if os.path.exists(path)]
+
+    def _rotate(self):
+        """当前文件超过大小限制时轮转，删除超出保留数量的旧文件"""
+        if not self.max_bytes or not os.path.exists(self.path) or os.path.getsize(self.path) < self.max_bytes:
+            return
+        for index in range(self.backup_count, 0, -1):
+            source = f"{self.path}.{index - 1}" if index > 1 else self.path
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index}")
+        if self.backup_count <= 0:
+            os.remove(self.path)
+        logger.info(f"[审计] 审计日志已轮转: {self.path}")
+
+    def flush(self):
+        """将队列中的记录写入文件"""
+        with self._write_lock:
+            with self._condition:
+                entries, self._pending = self._pending, []
+            if not entries:
+                return
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._rotate()
+                with open(self.path, "a", encoding="utf-8") as file:
+                    file.write("".join(
+                        json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n" for entry in entries
+                    ))
+            except OSError as e:
+                logger.error(f"[审计] 写入审计日志失败，丢弃 {len(entries)} 条记录: {e}")
+
+    def stop(self):
+        """停止后台写入并写入剩余记录"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def query(self, since: datetime = None, until: datetime = None, user: str = None, action: str = None,
+              recName: str = None, roomId: int = None, limit: int = 200) -> Dict:
+        """
+        查询审计日志，从最新的文件开始读取，找到足够的记录或早于开始时间后不再读取更早的文件
+        :return: 最近的 limit 条匹配记录，按时间从新到旧
+        """
+        self.flush()
+        data = []
+        since = since.isoformat(timespec="milliseconds") if since else None
+        until = until.isoformat(timespec="milliseconds") if until else None
+        with self._write_lock:
+            paths = self.files()
+        for path in paths:
+            matched = deque(maxlen=limit - len(data))
+            first_time = None
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    for line in file:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        first_time = first_time or entry["time"]
+                        if since and entry["time"] < since:
+                            continue
+                        if until and entry["time"] > until:
+                            break
+                        if user and entry.get("user") != user:
+                            continue
+                        if action and entry.get("action") != action:
+                            continue
+                        if recName and entry.get("recName") != recName:
+                            continue
+                        if roomId and entry.get("roomId") != roomId:
+                            continue
+                        matched.append(entry)
+            except FileNotFoundError:
+                # 查询期间文件被轮转
+                continue
+            data.extend(reversed(matched))
+            if len(data) >= limit or (since and first_time and first_time < since):
+                break
+        return {"total": len(data), "data": data}
+
+audit_journal = AuditJournal()
+
+def audited(action: str):
+    """
+    记录接口或操作函数的审计日志
+    从参数中读取 current_user / roomId / recType / recName，或 request 中的同名字段
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind_partial(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            request = arguments.get("request")
+            target = {
+                field: arguments.get(field) if arguments.get(field) is not None else getattr(request, field, None)
+                for field in ["recType", "recName", "roomId"]
+            }
+            start = time.monotonic()
+            try:
+                result = await func(*args, **kwargs)
+            except HTTPException as e:
+                audit_journal.record(arguments.get("current_user"), action, False, time.monotonic() - start,
+                                     error=str(e.detail), **target)
+                raise
+            except Exception as e:
+                audit_journal.record(arguments.get("current_user"), action, False, time.monotonic() - start,
+                                     error=str(e), **target)
+                raise
+            placement = result.get("placement") if isinstance(result, dict) else None
+            if placement:
+                target.update(recType=placement["recType"], recName=placement["recName"])
+            audit_journal.record(arguments.get("current_user"), action, True, time.monotonic() - start, **target)
+            return result
+        return wrapper
+    return decorator
@@ -1,25 +1,36 @@
-import requests
-from typing import Dict, List, Optional, Union
+import copy, requests
+from typing import Dict, List, Optional, Tuple, Union
 from core.logs import log, log_print
+from core.shaping import UpstreamLimiter, get_limiter
+from core.retry import RETRYABLE_STATUS, call_with_retry, idempotent_call, mark_unavailable, shared_call
+from core.timeouts import TimeoutPolicy, get_timeout_policy
+from core.pool import get_session
+from core.cache import room_config_cache
 
 logger = log()
 
 class BLRECAPI:
     """BLREC API"""
+
+    rec_type = "blrec"
     
-    def __init__(self, host: str, name: str, api_key: str = "", manage: bool = True):
+    def __init__(self, host: str, name: str, api_key: str = "", manage: bool = True, limiter: UpstreamLimiter = None, timeouts: TimeoutPolicy = None, session: requests.Session = None):
         """
         初始化 BLREC API
         :param host: BLREC 服务器地址
         :param name: BLREC 实例名称
         :param api_key: API 密钥
         :param manage: 是否启用管理功能
+        :param limiter: 请求限流器，不指定时使用该地址的默认限流器
+        :param timeouts: 超时策略，不指定时使用该地址的默认超时
+        :param session: 连接池，不指定时使用该地址共用的连接池
         """
         self.host = host.rstrip('/')
         self.name = name
         self.manage = manage
-        self.session = requests.Session()
-        self.session.trust_env = False
+        self.limiter = limiter or get_limiter(self.host)
+        self.timeouts = timeouts or get_timeout_policy(self.host)
+        self.session = session or get_session(self.host, self.limiter.max_concurrency or 10)
         self.headers = {}
         
         if api_key:
@@ -29,44 +40,72 @@ class BLRECAPI:
         manage_status = "启用" if self.manage else "禁用"
         logger.debug(f"[BLREC] {self.name} 管理功能{manage_status}")
 
-    def _make_request(self, endpoint: str, method: str = "GET", params: Dict = None, json: Dict = None) -> Optional[Union[Dict, List]]:
+    def _make_request(self, endpoint: str, method: str = "GET", params: Dict = None, json: Dict = None, op: str = None) -> Optional[Union[Dict, List]]:
         """
         发送 HTTP 请求到 BLREC API
         :param endpoint: API 端点
         :param method: HTTP 方法
         :param params: 查询参数
         :param json: POST 请求的 JSON 数据
+        :param op: 操作类型 read / control / mutate，决定重试策略，默认 GET 为 read，其他为 control
         :return: API 响应数据
         """
         if not self.manage and method != "GET":
             log_print(f"[BLREC] {self.name} 管理功能已禁用，拒绝 {method} 请求: {endpoint}", "WARNING")
             return None
             
+        op = op or ("read" if method == "GET" else "control")
+        if op == "read":
+            key = (self.host, endpoint, tuple(sorted((params or {}).items())), tuple(sorted(self.headers.items())))
+            return shared_call(key, self._send_with_retry, endpoint, method, params, json, op)
+        if op == "mutate":
+            return idempotent_call(self.host, method, endpoint, json, lambda: self._send_with_retry(endpoint, method, params, json, op))
+        return self._send_with_retry(endpoint, method, params, json, op)
+
+    def _send_with_retry(self, endpoint: str, method: str, params: Dict, json: Dict, op: str) -> Optional[Union[Dict, List]]:
+        """按重试策略发送请求"""
+        return call_with_retry(self.host, op, f"{method} {endpoint}", lambda: self._send_request(endpoint, method, params, json))
+
+    def _send_request(self, endpoint: str, method: str = "GET", params: Dict = None, json: Dict = None) -> Tuple[Optional[Union[Dict, List]], bool]:
+        """
+        实际发送一次请求
+        :return: (API 响应数据, 失败时是否可以重试)
+        """
         url = f"{self.host}/api/v1/{endpoint}"
         try:
-            response = self.session.request(
-                method, 
-                url, 
-                headers=self.headers, 
-                params=params,
-                json=json,
-                timeout=3
-            )
+            with self.limiter.acquire(), self.timeouts.measure(endpoint) as timeout:
+                response = self.session.request(
+                    method, 
+                    url, 
+                    headers=self.headers, 
+                    params=params,
+                    json=json,
+                    timeout=timeout
+                )
             if response.status_code in [200, 201]:
                 data = response.json()
-                return data
+                return data, False
             else:
                 log_print(f"[BLREC] {self.name} 请求失败，状态码: {response.status_code}, URL: {url}", "ERROR")
-                return None
+                if response.status_code >= 500:
+                    mark_unavailable()
+                return None, response.status_code in RETRYABLE_STATUS
         except requests.exceptions.Timeout:
             log_print(f"[BLREC] {self.name} 请求超时, URL: {url}", "ERROR")
-            return None
+            return None, True
+        except requests.exceptions.ConnectionError as e:
+            log_print(f"[BLREC] {self.name} 连接失败: {e}, URL: {url}", "ERROR")
+            return None, True
         except Exception as e:
             log_print(f"[BLREC] {self.name} 请求异常: {e}, URL: {url}", "ERROR")
-            return None
+            return None, False
 
     def get_rooms(self, page: int = 1, size: int = 100, select: str = "all") -> List[Dict]:
         """获取所有直播间信息"""
+        return self.fetch_rooms(page, size, select) or []
+
+    def fetch_rooms(self, page: int = 1, size: int = 100, select: str = "all") -> Optional[List[Dict]]:
+        """获取所有直播间信息，请求失败时返回 None"""
         params = {
             "page": page,
             "size": min(max(size, 10), 100),
@@ -74,8 +113,8 @@ class BLRECAPI:
         }
         
         data = self._make_request("tasks/data", params=params)
-        if not data or not isinstance(data, list):
-            return []
+        if not isinstance(data, list):
+            return None
             
         for item in data:
             item["recServer"] = {
@@ -120,13 +159,22 @@ class BLRECAPI:
         """
         return self._make_request(f"tasks/{room_id}/status")
 
-    def get_room_config(self, room_id: str) -> Optional[Dict]:
+    def get_room_config(self, room_id: str, refresh: bool = False) -> Optional[Dict]:
         """
-        获取直播间配置
+        获取直播间配置，优先使用缓存
         :param room_id: 房间号
+        :param refresh: 是否跳过缓存重新获取
         :return: 配置信息
         """
-        return self._make_request(f"tasks/{room_id}/config")
+        key = (self.rec_type, self.host, str(room_id))
+        if not refresh:
+            cached = room_config_cache.get(key)
+            if cached is not None:
+                return copy.deepcopy(cached)
+        data = self._make_request(f"tasks/{room_id}/config")
+        if data is not None:
+            room_config_cache.set(key, copy.deepcopy(data))
+        return data
 
     def update_room_config(self, room_id: str, config: Dict) -> Optional[Dict]:
         """
@@ -135,7 +183,9 @@ class BLRECAPI:
         :param config: 配置信息
         :return: 更新结果
         """
-        return self._make_request(f"tasks/{room_id}/config", method="PUT", json=config)
+        response = self._make_request(f"tasks/{room_id}/config", method="PUT", json=config)
+        room_config_cache.invalidate((self.rec_type, self.host, str(room_id)))
+        return response
 
     def start_recording(self, room_id: str) -> Optional[Dict]:
         """
@@ -159,11 +209,14 @@ class BLRECAPI:
         :param room_id: 房间号
         :return: 删除结果
         """
-        return self._make_request(f"tasks/{room_id}", method="DELETE")
+        response = self._make_request(f"tasks/{room_id}", method="DELETE", op="mutate")
+        # 重新添加的直播间不应使用旧的设置
+        room_config_cache.invalidate((self.rec_type, self.host, str(room_id)))
+        return response
 
     def create_room(self, room_id: int, auto_record: bool = True) -> Optional[Dict]:
         """创建新的直播间"""
-        data = self._make_request(f"tasks/{room_id}", method="POST")
+        data = self._make_request(f"tasks/{room_id}", method="POST", op="mutate")
         if not data:
             return None
         
@@ -0,0 +1,58 @@
+import time, threading
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+class TTLCache:
+    """带过期时间的内存缓存"""
+
+    def __init__(self, ttl: float, max_size: int = 10000):
+        """
+        初始化缓存
+        :param ttl: 缓存有效期(秒)
+        :param max_size: 最大缓存条目数，超出后优先清理过期条目，再清理最早写入的条目
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存，过期或不存在时返回 default"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expire_at, value = item
+            if expire_at < time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """写入缓存"""
+        expire_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.max_size:
+                self._evict()
+            self._data[key] = (expire_at, value)
+
+    def invalidate(self, key: Hashable = None):
+        """删除指定缓存，不指定时清空全部"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def _evict(self):
+        now = time.monotonic()
+        expired = [k for k, (expire_at, _) in self._data.items() if expire_at < now]
+        for k in expired:
+            del self._data[k]
+        if len(self._data) >= self.max_size:
+            del self._data[next(iter(self._data))]
+
+    def __len__(self):
+        return len(self._data)
+
+## 直播间设置缓存，键为 (录播类型, 录播机地址, 房间号)
+room_config_cache = TTLCache(600)
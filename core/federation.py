@@ -0,0 +1,188 @@
+import copy, time, requests, threading
+from typing import Dict, List, Optional, Tuple, Union
+from core.logs import log, log_print
+from core.singleflight import upstream_flight
+from core.shaping import UpstreamLimiter, get_limiter
+from core.retry import RETRYABLE_STATUS, call_with_retry
+from core.timeouts import TimeoutPolicy, get_timeout_policy
+from core.pool import get_session
+from core.roominfo import room_id_of
+from core.webhooks import patch_room
+
+logger = log()
+
+## 各面板已同步的直播间列表与变化版本号，按面板地址保存
+_site_state: Dict[str, Dict] = {}
+_site_lock = threading.Lock()
+
+## 变化记录不包含码率与磁盘写入速率，增量同步超过该时间(秒)后重新获取完整列表
+FULL_SYNC_INTERVAL = 60
+
+class RecStutasAPI:
+    """其他 RecStutas 面板 API，只读，将其汇总的直播间与录播机作为数据来源"""
+
+    rec_type = "recstutas"
+
+    def __init__(self, host: str, name: str, token: str = "", limiter: UpstreamLimiter = None, timeouts: TimeoutPolicy = None, session: requests.Session = None,
+                 full_sync_interval: float = FULL_SYNC_INTERVAL):
+        """
+        初始化 RecStutas API
+        :param host: 面板地址
+        :param name: 站点名称
+        :param token: 面板启用认证时使用的 Token
+        :param limiter: 请求限流器，不指定时使用该地址的默认限流器
+        :param timeouts: 超时策略，不指定时使用该地址的默认超时
+        :param session: 连接池，不指定时使用该地址共用的连接池
+        :param full_sync_interval: 重新获取完整列表的间隔(秒)，期间只获取变化
+        """
+        self.host = host.rstrip('/')
+        self.name = name
+        self.manage = False
+        self.full_sync_interval = full_sync_interval
+        self.limiter = limiter or get_limiter(self.host)
+        self.timeouts = timeouts or get_timeout_policy(self.host)
+        self.session = session or get_session(self.host, self.limiter.max_concurrency or 10)
+        self.headers = {}
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+
+    def _make_request(self, endpoint: str, method: str = "GET", params: Dict = None) -> Optional[Union[Dict, List]]:
+        """
+        发送 HTTP 请求到面板 API，只支持读取
+        :param endpoint: API 端点
+        :param params: 查询参数
+        :return: API 响应数据
+        """
+        if method != "GET":
+            log_print(f"[站点] {self.name} 只读，拒绝 {method} 请求: {endpoint}", "WARNING")
+            return None
+        key = (self.host, endpoint, tuple(sorted((params or {}).items())), tuple(sorted(self.headers.items())))
+        return upstream_flight.do(
+            key, call_with_retry, self.host, "read", f"GET {endpoint}", lambda: self._send_request(endpoint, params)
+        )
+
+    def _send_request(self, endpoint: str, params: Dict = None) -> Tuple[Optional[Union[Dict, List]], bool]:
+        """
+        实际发送一次请求
+        :return: (API 响应数据, 失败时是否可以重试)
+        """
+        url = f"{self.host}/api/{endpoint}"
+        try:
+            with self.limiter.acquire(), self.timeouts.measure(endpoint) as timeout:
+                response = self.session.get(url, headers=self.headers, params=params, timeout=timeout)
+            if response.status_code == 200:
+                return response.json(), False
+            if response.status_code == 404:
+                return None, False
+            log_print(f"[站点] {self.name} 请求失败，状态码: {response.status_code}, URL: {url}", "ERROR")
+            return None, response.status_code in RETRYABLE_STATUS
+        except ValueError:
+            log_print(f"[站点] {self.name} 响应不是 JSON, URL: {url}", "ERROR")
+            return None, False
+        except requests.exceptions.Timeout:
+            log_print(f"[站点] {self.name} 请求超时, URL: {url}", "ERROR")
+            return None, True
+        except requests.exceptions.ConnectionError as e:
+            log_print(f"[站点] {self.name} 连接失败: {e}, URL: {url}", "ERROR")
+            return None, True
+        except Exception as e:
+            log_print(f"[站点] {self.name} 请求异常: {e}, URL: {url}", "ERROR")
+            return None, False
+
+    def _tag(self, rooms: List[Dict]) -> List[Dict]:
+        """在直播间的 recServer 中标记所属站点"""
+        tagged = []
+        for room in rooms:
+            rec_server = dict(room.get("recServer") or {}, recSite=self.name)
+            rec_server.pop("recStale", None)
+            rec_server.pop("recUpdatedAt", None)
+            tagged.append(dict(room, recServer=rec_server))
+        return tagged
+
+    def _apply_changes(self, rooms: List[Dict], changes: List[Dict]) -> Optional[List[Dict]]:
+        """
+        将面板的直播间变化应用到已同步的列表，按房间号、录播机与地址匹配
+        :return: 更新后的列表，无法确定对应的直播间时返回 None，需要重新获取完整列表
+        """
+        rooms = list(rooms)
+        for change in changes:
+            if not change.get("recHost"):
+                # 旧版本面板的变化记录没有地址，同名录播机有多个地址时无法区分
+                return None
+            candidates = [
+                index for index, room in enumerate(rooms)
+                if room_id_of(room) == change["roomId"]
+                and (room.get("recServer") or {}).get("recName") == change["recName"]
+                and (room.get("recServer") or {}).get("recType") == change["recType"]
+            ]
+            matches = [
+                index for index in candidates
+                if (rooms[index].get("recServer") or {}).get("recHost") == change["recHost"]
+            ]
+            if not matches:
+                if candidates or change["type"] != "remove":
+                    return None
+                continue
+            if change["type"] == "remove":
+                rooms = [room for index, room in enumerate(rooms) if index not in matches]
+                continue
+            view = change["room"]
+            for index in matches:
+                room = patch_room(rooms[index], view)
+                if "task_status" in room:
+                    room["task_status"] = dict(
+                        room["task_status"] or {},
+                        dl_rate=view["bitrate"] * 1000 * 1000 / 8,
+                        rec_rate=view["disk"] * 1024 * 1024
+                    )
+                else:
+                    room["ioStats"] = dict(room.get("ioStats") or {}, networkMbps=view["bitrate"], diskMBps=view["disk"])
+                rooms[index] = room
+        return rooms
+
+    def fetch_rooms(self) -> Optional[List[Dict]]:
+        """
+        获取面板汇总的直播间列表，请求失败时返回 None
+        面板支持 /api/room/changes 时只获取上次同步之后的变化，每隔 full_sync_interval 秒获取一次完整列表以更新码率
+        """
+        with _site_lock:
+            state = copy.copy(_site_state.get(self.host))
+
+        if state and state.get("version") is not None and time.monotonic() - state["synced_at"] < self.full_sync_interval:
+            changes = self._make_request("room/changes", params={"since": state["version"]})
+            # 面板重启后版本号重新计数，epoch 变化或版本号回退时重新获取完整列表
+            if (
+                isinstance(changes, dict) and not changes.get("reset")
+                and changes.get("epoch") == state.get("epoch")
+                and changes["version"] >= state["version"]
+            ):
+                rooms = self._apply_changes(state["rooms"], changes.get("data") or [])
+                if rooms is not None:
+                    with _site_lock:
+                        _site_state[self.host] = dict(state, version=changes["version"], rooms=rooms)
+                    return self._tag(rooms)
+
+        # 先获取版本号再获取完整列表，期间的变化在下次同步时重复应用
+        # 面板不支持 /api/room/changes 时之后只获取完整列表
+        version, epoch = None, None
+        if not state or state.get("version") is not None:
+            latest = self._make_request("room/changes", params={"since": 2 ** 53, "limit": 1})
+            if isinstance(latest, dict):
+                version, epoch = latest.get("version"), latest.get("epoch")
+        rooms = self._make_request("room")
+        if not isinstance(rooms, list):
+            return None
+        with _site_lock:
+            _site_state[self.host] = {"version": version, "epoch": epoch, "rooms": rooms, "synced_at": time.monotonic()}
+        return self._tag(rooms)
+
+    def get_rooms(self) -> List[Dict]:
+        """获取面板汇总的直播间列表"""
+        return self.fetch_rooms() or []
+
+    def fetch_servers(self) -> Optional[List[Dict]]:
+        """获取面板的录播机列表，请求失败时返回 None"""
+        servers = self._make_request("server")
+        if not isinstance(servers, list):
+            return None
+        return [dict(server, recSite=self.name) for server in servers]
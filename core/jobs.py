@@ -0,0 +1,196 @@
+import asyncio, json, uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from core.logs import log
+
+logger = log()
+
+class Job:
+    """后台任务"""
+
+    def __init__(self, kind: str, items: List[Any], user: str = None):
+        """
+        :param kind: 任务类型
+        :param items: 待处理的条目
+        :param user: 提交任务的用户
+        """
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.user = user
+        self.status = "queued"
+        self.items = [
+            {"index": index, "item": item, "status": "pending", "result": None, "error": None}
+            for index, item in enumerate(items)
+        ]
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.cancelled = False
+        self.version = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ["completed", "failed", "cancelled"]
+
+    def notify(self):
+        """通知进度变化"""
+        self.version += 1
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_changed(self, version: int, timeout: float) -> bool:
+        """
+        等待进度变化
+        :param version: 上次读取进度时的版本
+        :return: 超时前是否有变化
+        """
+        if self.version != version:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def progress(self, include_items: bool = True) -> Dict:
+        """获取任务进度"""
+        count = {}
+        for item in self.items:
+            count[item["status"]] = count.get(item["status"], 0) + 1
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "user": self.user,
+            "status": self.status,
+            "total": len(self.items),
+            "succeeded": count.get("succeeded", 0),
+            "failed": count.get("failed", 0),
+            "cancelled": count.get("cancelled", 0),
+            "pending": count.get("pending", 0) + count.get("running", 0),
+            "createdAt": self.created_at.isoformat(timespec="seconds"),
+            "startedAt": self.started_at.isoformat(timespec="seconds") if self.started_at else None,
+            "finishedAt": self.finished_at.isoformat(timespec="seconds") if self.finished_at else None
+        }
+        if include_items:
+            data["items"] = self.items
+        return data
+
+class JobManager:
+    """进程内后台任务队列，任务与请求连接无关，连接断开后继续执行"""
+
+    def __init__(self, concurrency: int = 4, keep: int = 50):
+        """
+        :param concurrency: 每个任务同时处理的条目数
+        :param keep: 保留的历史任务数量
+        """
+        self.concurrency = max(int(concurrency), 1)
+        self.keep = keep
+        self.jobs: Dict[str, Job] = {}
+        self._tasks = set()
+
+    def submit(self, kind: str, items: List[Any], handler: Callable[[Any], Awaitable[Any]],
+               user: str = None, on_finish: Callable[[Job], Awaitable[None]] = None) -> Job:
+        """
+        提交任务
+        :param handler: 处理单个条目的协程函数，抛出异常视为该条目失败
+        :param on_finish: 任务结束后执行的协程函数
+        :return: 任务
+        """
+        job = Job(kind, [self._serialize(item) for item in items], user)
+        self.jobs[job.id] = job
+        self._cleanup()
+
+        task = asyncio.create_task(self._run(job, items, handler, on_finish))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        logger.info(f"[任务] {'用户 ' + user + ' ' if user else ''}提交任务 {job.id} ({kind})，共 {len(items)} 项")
+        return job
+
+    @staticmethod
+    def _serialize(item: Any) -> Any:
+        if hasattr(item, "dict"):
+            return item.dict()
+        return item
+
+    def _cleanup(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        while len(self.jobs) > self.keep and finished:
+            del self.jobs[finished.pop(0)]
+
+    async def _run(self, job: Job, items: List[Any], handler: Callable[[Any], Awaitable[Any]],
+                   on_finish: Optional[Callable[[Job], Awaitable[None]]]):
+        job.status = "running"
+        job.started_at = datetime.now()
+        job.notify()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_item(entry: Dict, item: Any):
+            async with semaphore:
+                if job.cancelled:
+                    entry["status"] = "cancelled"
+                    return
+                entry["status"] = "running"
+                try:
+                    entry["result"] = await handler(item)
+                    entry["status"] = "succeeded"
+                except Exception as e:
+                    entry["error"] = str(getattr(e, "detail", e))
+                    entry["status"] = "failed"
+                job.notify()
+
+        await asyncio.gather(*(run_item(entry, item) for entry, item in zip(job.items, items)))
+
+        if on_finish:
+            try:
+                await on_finish(job)
+            except Exception as e:
+                logger.error(f"[任务] 任务 {job.id} 收尾失败: {e}")
+
+        if job.cancelled:
+            job.status = "cancelled"
+        elif job.items and all(entry["status"] == "failed" for entry in job.items):
+            job.status = "failed"
+        else:
+            job.status = "completed"
+        job.finished_at = datetime.now()
+        job.notify()
+        logger.info(f"[任务] 任务 {job.id} 结束: {job.status}")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def summaries(self) -> List[Dict]:
+        """获取所有任务概况"""
+        return [job.progress(include_items=False) for job in reversed(list(self.jobs.values()))]
+
+    def cancel(self, job_id: str) -> bool:
+        """取消任务，已开始处理的条目会继续完成"""
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancelled = True
+        job.notify()
+        logger.info(f"[任务] 任务 {job_id} 已取消")
+        return True
+
+    async def stream(self, job: Job, interval: float = 15) -> AsyncIterator[str]:
+        """
+        以 SSE 格式推送任务进度，任务结束后停止
+        :param interval: 无变化时发送心跳的间隔(秒)
+        """
+        sent = set()
+        while True:
+            finished = job.finished
+            version = job.version
+            progress = job.progress(include_items=False)
+            progress["items"] = [
+                entry for entry in job.items
+                if entry["index"] not in sent and entry["status"] not in ["pending", "running"]
+            ]
+            sent.update(entry["index"] for entry in progress["items"])
+            yield f"data: {json.dumps(progress, ensure_ascii=False, default=str)}\n\n"
+            if finished:
+                break
+            while not await job.wait_changed(version, interval):
+                yield ": keep-alive\n\n"
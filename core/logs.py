@@ -1,22 +1,35 @@
 # core/logs.py
 
 import os
+import gzip
+import time
+import queue
 import logging
 import shutil
+import threading
 from logging.handlers import TimedRotatingFileHandler
 
 class DiskSpaceCheckHandler(TimedRotatingFileHandler):
     """检查磁盘空间的日志处理器"""
     
     def __init__(self, filename, when='h', interval=1, backupCount=0, encoding=None, 
-                 delay=False, utc=False, atTime=None, min_free_space_mb=100):
+                 delay=False, utc=False, atTime=None, min_free_space_mb=100,
+                 max_bytes=0, compress=False, max_total_bytes=0):
         """
         初始化处理器，增加最小可用空间参数
         :param min_free_space_mb: 最小可用空间(MB)
+        :param max_bytes: 单个日志文件的最大大小(字节)，超过后轮转，0 为只按时间轮转
+        :param compress: 是否在后台压缩轮转后的日志文件
+        :param max_total_bytes: 日志目录的最大总大小(字节)，超过后删除最旧的日志，0 为不限制
         """
         super().__init__(filename, when, interval, backupCount, encoding, delay, utc, atTime)
         self.min_free_space_mb = min_free_space_mb
         self.emit_failed = False
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.max_total_bytes = max_total_bytes
+        self._queue = queue.Queue()
+        self._worker = None
     
     def emit(self, record):
         """
@@ -48,6 +61,87 @@ class DiskSpaceCheckHandler(TimedRotatingFileHandler):
         except Exception as e:
             print(f"日志处理异常: {e}")
     
+    def shouldRollover(self, record):
+        """到达轮转时间或文件超过大小限制时轮转"""
+        if super().shouldRollover(record):
+            return True
+        if self.max_bytes > 0:
+            if self.stream is None:
+                self.stream = self._open()
+            message = f"{self.format(record)}{self.terminator}"
+            self.stream.seek(0, 2)
+            if self.stream.tell() + len(message.encode(self.encoding or "utf-8")) >= self.max_bytes:
+                return True
+        return False
+
+    def doRollover(self):
+        """
+        轮转日志文件
+        文件名为 BCK.日期.log，同一天多次轮转时追加序号，压缩与清理在后台线程中进行
+        """
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        now = int(time.time())
+        period = self.rolloverAt - self.interval if now >= self.rolloverAt else now
+        time_tuple = time.gmtime(period) if self.utc else time.localtime(period)
+        base_name = self.rotation_filename(f"{self.baseFilename}.{time.strftime(self.suffix, time_tuple)}")
+        dfn, index = base_name, 0
+        while os.path.exists(dfn) or os.path.exists(f"{dfn}.gz"):
+            index += 1
+            dfn = f"{base_name}.{index}"
+        if os.path.exists(self.baseFilename):
+            self.rotate(self.baseFilename, dfn)
+            self._submit(dfn)
+
+        if not self.delay:
+            self.stream = self._open()
+        self.rolloverAt = self.computeRollover(now)
+
+    def _submit(self, dfn):
+        """提交后台压缩与清理"""
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._work, name="log-rotate", daemon=True)
+            self._worker.start()
+        self._queue.put(dfn)
+
+    def _work(self):
+        while True:
+            dfn = self._queue.get()
+            try:
+                if self.compress and os.path.exists(dfn):
+                    # 先写入临时文件再改名，避免查询读到未写完的压缩文件
+                    with open(dfn, "rb") as source, gzip.open(f"{dfn}.gz.tmp", "wb") as target:
+                        shutil.copyfileobj(source, target)
+                    os.replace(f"{dfn}.gz.tmp", f"{dfn}.gz")
+                    os.remove(dfn)
+                self._cleanup()
+            except Exception as e:
+                print(f"[日志] 轮转后处理失败: {e}")
+
+    def _cleanup(self):
+        """按保留数量与总大小删除最旧的日志文件"""
+        directory, prefix = os.path.split(self.baseFilename)
+        rotated = []
+        for name in os.listdir(directory):
+            if name.startswith(f"{prefix}."):
+                path = os.path.join(directory, name)
+                rotated.append((os.path.getmtime(path), os.path.getsize(path), path))
+        rotated.sort()
+
+        if self.backupCount > 0:
+            while len(rotated) > self.backupCount:
+                os.remove(rotated.pop(0)[2])
+
+        if self.max_total_bytes > 0:
+            current = os.path.getsize(self.baseFilename) if os.path.exists(self.baseFilename) else 0
+            total = current + sum(size for _, size, _ in rotated)
+            while rotated and total > self.max_total_bytes:
+                _, size, path = rotated.pop(0)
+                os.remove(path)
+                total -= size
+
     def _get_free_space(self):
         """获取日志文件所在磁盘的可用空间(MB)"""
         try:
@@ -101,7 +195,10 @@ def log():
         interval=1,
         backupCount=30,
         encoding="utf-8",
-        min_free_space_mb=50
+        min_free_space_mb=50,
+        max_bytes=50 * 1024 * 1024,
+        compress=True,
+        max_total_bytes=1024 * 1024 * 1024
     )
     file_handler.suffix = "%Y-%m-%d.log"
     file_handler.setLevel(logging.DEBUG)
@@ -119,6 +216,25 @@ def log():
 
     return logger
 
+def configure_log(options):
+    """
+    根据 LOG 配置更新日志轮转参数
+    :param options: {"MAX_BYTES": 52428800, "BACKUP_COUNT": 30, "COMPRESS": True, "MAX_TOTAL_BYTES": 1073741824}
+    """
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, DiskSpaceCheckHandler):
+            handler.max_bytes = options.get("MAX_BYTES", 50 * 1024 * 1024)
+            handler.backupCount = options.get("BACKUP_COUNT", 30)
+            handler.compress = options.get("COMPRESS", True)
+            handler.max_total_bytes = options.get("MAX_TOTAL_BYTES", 1024 * 1024 * 1024)
+
+def log_file_path():
+    """获取当前日志文件路径，未写入文件时返回 None"""
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, DiskSpaceCheckHandler):
+            return handler.baseFilename
+    return None
+
 def log_print(message, level="INFO"):
     """
     记录日志并输出到控制台。
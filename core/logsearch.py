@@ -0,0 +1,273 @@
+import os, re, gzip, json, asyncio, threading
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+from core.logs import log
+
+logger = log()
+
+## 日志行格式: 2024-01-01 12:00:00,000 [INFO] MainProcess - 内容
+LINE_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),(\d{3}) \[(\w+)\] (\S+) - (.*)$")
+
+LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+
+def parse_line(line: str) -> Optional[Dict]:
+    """解析一行日志，不是日志开头的行(如异常堆栈)返回 None"""
+    match = LINE_PATTERN.match(line)
+    if not match:
+        return None
+    return {
+        "time": datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S").replace(microsecond=int(match.group(2)) * 1000),
+        "level": match.group(3),
+        "process": match.group(4),
+        "message": match.group(5)
+    }
+
+class LogFilter:
+    """日志筛选条件"""
+
+    def __init__(self, since: datetime = None, until: datetime = None, levels: List[str] = None, keywords: List[str] = None):
+        """
+        :param since: 开始时间
+        :param until: 结束时间
+        :param levels: 日志等级
+        :param keywords: 关键字，全部包含才匹配，如 [录播姬]、录播机名称、房间号
+        """
+        self.since = since
+        self.until = until
+        self.levels = {level.upper() for level in levels} if levels else None
+        self.keywords = keywords or []
+
+    def match(self, entry: Dict) -> bool:
+        if self.since and entry["time"] < self.since:
+            return False
+        if self.until and entry["time"] > self.until:
+            return False
+        if self.levels and entry["level"] not in self.levels:
+            return False
+        return all(keyword in entry["message"] for keyword in self.keywords)
+
+def _complete_size(file) -> int:
+    """最后一个换行符之后的位置，之后的内容是正在写入的不完整的行"""
+    end = file.seek(0, os.SEEK_END)
+    position = end
+    while position > 0:
+        size = min(4096, position)
+        position -= size
+        file.seek(position)
+        chunk = file.read(size)
+        index = chunk.rfind(b"\n")
+        if index >= 0:
+            return position + index + 1
+    return 0
+
+def _iter_entries(file, offset: int = 0, end: int = None):
+    """
+    从偏移位置逐条读取日志，异常堆栈等续行合并到上一条
+    :param end: 读取到该位置为止，不指定时读取到文件末尾
+    :return: (日志开始偏移, 日志)
+    """
+    file.seek(offset)
+    entry, entry_offset = None, offset
+    position = offset
+    for raw in file:
+        if end is not None and position >= end:
+            break
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        parsed = parse_line(line)
+        if parsed is not None:
+            if entry is not None:
+                yield entry_offset, entry
+            entry, entry_offset = parsed, position
+        elif entry is not None:
+            entry["message"] += "\n" + line
+        position += len(raw)
+    if entry is not None:
+        yield entry_offset, entry
+
+class LogIndex:
+    """
+    日志文件的时间索引，每个时间段记录第一条日志的偏移位置
+    索引保存在日志目录的 index 子目录中，查询时直接跳到开始时间所在的位置
+    """
+
+    def __init__(self, directory: str, prefix: str = "BCK", bucket: int = 300):
+        """
+        :param directory: 日志目录
+        :param prefix: 日志文件名前缀
+        :param bucket: 索引时间段长度(秒)
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.bucket = bucket
+        self.index_directory = os.path.join(directory, "index")
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _open(path: str):
+        return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+    def files(self) -> List[str]:
+        """所有日志文件，按修改时间从旧到新"""
+        paths = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if (name == self.prefix or name.startswith(f"{self.prefix}.")) and not name.endswith(".tmp")
+        ]
+        return sorted((path for path in paths if os.path.isfile(path)), key=os.path.getmtime)
+
+    def _index_path(self, path: str) -> str:
+        return os.path.join(self.index_directory, f"{os.path.basename(path)}.idx")
+
+    def _build(self, path: str, index: Optional[Dict]) -> Dict:
+        """建立或续建索引，正在写入的日志文件只扫描新增的部分"""
+        stat = os.stat(path)
+        if index and index.get("size", 0) <= stat.st_size and not path.endswith(".gz") and index.get("inode") == stat.st_ino:
+            offset = index["size"]
+        else:
+            index, offset = None, 0
+        index = index or {"inode": stat.st_ino, "size": 0, "start": None, "end": None, "buckets": []}
+
+        buckets = index["buckets"]
+        last_bucket = buckets[-1][0] if buckets else None
+        with self._open(path) as file:
+            # 正在写入的日志文件只索引到最后一个完整的行，剩余部分下次继续
+            end = None if path.endswith(".gz") else _complete_size(file)
+            for entry_offset, entry in _iter_entries(file, offset, end):
+                timestamp = int(entry["time"].timestamp())
+                bucket = timestamp - timestamp % self.bucket
+                if bucket != last_bucket:
+                    buckets.append([bucket, entry_offset])
+                    last_bucket = bucket
+                index["start"] = index["start"] or timestamp
+                index["end"] = timestamp
+            index["size"] = end if end is not None else file.tell()
+        index["mtime"] = stat.st_mtime
+        return index
+
+    def get(self, path: str) -> Dict:
+        """获取日志文件的索引，文件有变化时更新"""
+        with self._lock:
+            index_path = self._index_path(path)
+            index = None
+            if os.path.exists(index_path):
+                try:
+                    with open(index_path, "r", encoding="utf-8") as file:
+                        index = json.load(file)
+                except (OSError, ValueError):
+                    index = None
+            stat = os.stat(path)
+            if index is not None and index.get("mtime") == stat.st_mtime and index.get("inode") == stat.st_ino:
+                return index
+
+            index = self._build(path, index)
+            os.makedirs(self.index_directory, exist_ok=True)
+            with open(index_path, "w", encoding="utf-8") as file:
+                json.dump(index, file)
+            self._prune()
+            return index
+
+    def _prune(self):
+        """删除日志文件已被清理的索引"""
+        names = set(os.listdir(self.directory))
+        for name in os.listdir(self.index_directory):
+            if name.endswith(".idx") and name[:-4] not in names:
+                os.remove(os.path.join(self.index_directory, name))
+
+    def _seek_offset(self, index: Dict, since: Optional[datetime]) -> int:
+        if since is None or not index["buckets"]:
+            return 0
+        target = since.timestamp()
+        offset = 0
+        for bucket, bucket_offset in index["buckets"]:
+            if bucket + self.bucket <= target:
+                offset = bucket_offset
+                continue
+            if bucket <= target:
+                offset = bucket_offset
+            break
+        return offset
+
+    def search(self, log_filter: LogFilter, limit: int = 200) -> Dict:
+        """
+        查询日志
+        :return: 最近的 limit 条匹配日志，按时间从旧到新
+        """
+        matched = deque(maxlen=limit)
+        scanned_files = 0
+        for path in self.files():
+            try:
+                index = self.get(path)
+                if index["start"] is None:
+                    continue
+                if log_filter.since and index["end"] + 1 < log_filter.since.timestamp():
+                    continue
+                if log_filter.until and index["start"] > log_filter.until.timestamp():
+                    continue
+
+                scanned_files += 1
+                with self._open(path) as file:
+                    for _, entry in _iter_entries(file, self._seek_offset(index, log_filter.since)):
+                        if log_filter.until and entry["time"] > log_filter.until:
+                            break
+                        if log_filter.match(entry):
+                            matched.append(entry)
+            except (FileNotFoundError, EOFError) as e:
+                # 查询期间日志文件被压缩或清理，跳过该文件
+                logger.debug(f"[日志] 跳过已轮转的日志文件 {path}: {e}")
+                continue
+
+        return {
+            "files": scanned_files,
+            "total": len(matched),
+            "data": [dict(entry, time=entry["time"].isoformat(timespec="milliseconds")) for entry in matched]
+        }
+
+    async def tail(self, log_filter: LogFilter, interval: float = 1, heartbeat: float = 15) -> AsyncIterator[str]:
+        """
+        以 SSE 格式推送新写入的日志
+        :param interval: 检查新日志的间隔(秒)
+        :param heartbeat: 无新日志时发送心跳的间隔(秒)
+        """
+        path = os.path.join(self.directory, self.prefix)
+        stat = os.stat(path) if os.path.exists(path) else None
+        inode, offset = (stat.st_ino, stat.st_size) if stat else (None, 0)
+        buffer = b""
+        idle = 0.0
+
+        def read_new():
+            nonlocal inode, offset, buffer
+            if not os.path.exists(path):
+                return []
+            stat = os.stat(path)
+            if stat.st_ino != inode or stat.st_size < offset:
+                # 日志已轮转，从新文件开头读取
+                inode, offset, buffer = stat.st_ino, 0, b""
+            if stat.st_size == offset:
+                return []
+            with open(path, "rb") as file:
+                file.seek(offset)
+                data = file.read(stat.st_size - offset)
+            offset += len(data)
+            lines = (buffer + data).split(b"\n")
+            buffer = lines.pop()
+            return [line.decode("utf-8", errors="replace").rstrip("\r") for line in lines]
+
+        while True:
+            lines = await asyncio.to_thread(read_new)
+            sent = False
+            for line in lines:
+                entry = parse_line(line)
+                if entry is None or not log_filter.match(entry):
+                    continue
+                entry["time"] = entry["time"].isoformat(timespec="milliseconds")
+                yield f"data: {json.dumps(entry, ensure_ascii=False)}\n\n"
+                sent = True
+            if sent:
+                idle = 0.0
+            else:
+                idle += interval
+                if idle >= heartbeat:
+                    idle = 0.0
+                    yield ": keep-alive\n\n"
+            await asyncio.sleep(interval)
@@ -0,0 +1,97 @@
+import os, json, sqlite3, threading, time
+from datetime import datetime
+from typing import Dict, List, Optional
+from core.logs import log
+
+logger = log()
+
+## 快照格式版本，格式变化时递增，旧版本的快照不再加载
+SNAPSHOT_VERSION = 1
+
+class SnapshotStore:
+    """将各录播机的直播间列表保存到本地 SQLite 文件，重启后立即加载"""
+
+    def __init__(self, path: str = "data/snapshot.db"):
+        """
+        :param path: 快照文件路径
+        """
+        self.path = path
+        self.saved_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path)
+        connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS recorders ("
+            "rec_type TEXT, rec_name TEXT, rec_host TEXT, updated_at TEXT, rooms TEXT, "
+            "PRIMARY KEY (rec_type, rec_name, rec_host))"
+        )
+        return connection
+
+    def save(self, recorders: List[Dict]):
+        """
+        保存快照，整体替换上一次的内容
+        :param recorders: [{"recType", "recName", "recHost", "updatedAt": datetime, "rooms": [...]}]
+        """
+        start = time.monotonic()
+        saved_at = datetime.now()
+        rows = [
+            (
+                item["recType"], item["recName"], item["recHost"],
+                item["updatedAt"].isoformat(),
+                json.dumps(item["rooms"], ensure_ascii=False, separators=(",", ":"))
+            )
+            for item in recorders
+        ]
+        with self._lock:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.execute("DELETE FROM recorders")
+                    connection.executemany("INSERT INTO recorders VALUES (?, ?, ?, ?, ?)", rows)
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                        [("version", str(SNAPSHOT_VERSION)), ("saved_at", saved_at.isoformat())]
+                    )
+            finally:
+                connection.close()
+        self.saved_at = saved_at
+        logger.debug(f"[快照] 已保存 {len(rows)} 个录播机，耗时 {time.monotonic() - start:.3f} 秒")
+
+    def load(self) -> List[Dict]:
+        """
+        加载快照
+        :return: 与 save 相同的格式，文件不存在或版本不一致时返回空列表
+        """
+        if not os.path.exists(self.path):
+            return []
+        start = time.monotonic()
+        with self._lock:
+            connection = self._connect()
+            try:
+                meta = dict(connection.execute("SELECT key, value FROM meta").fetchall())
+                if meta.get("version") != str(SNAPSHOT_VERSION):
+                    logger.warning(f"[快照] 快照版本 {meta.get('version')} 与当前版本 {SNAPSHOT_VERSION} 不一致，跳过加载")
+                    return []
+                rows = connection.execute("SELECT rec_type, rec_name, rec_host, updated_at, rooms FROM recorders").fetchall()
+            finally:
+                connection.close()
+
+        recorders = [
+            {
+                "recType": rec_type,
+                "recName": rec_name,
+                "recHost": rec_host,
+                "updatedAt": datetime.fromisoformat(updated_at),
+                "rooms": json.loads(rooms)
+            }
+            for rec_type, rec_name, rec_host, updated_at, rooms in rows
+        ]
+        if meta.get("saved_at"):
+            self.saved_at = datetime.fromisoformat(meta["saved_at"])
+        logger.info(f"[快照] 已加载 {len(recorders)} 个录播机的快照 ({meta.get('saved_at')})，耗时 {time.monotonic() - start:.3f} 秒")
+        return recorders
@@ -0,0 +1,150 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from core.logs import log
+
+logger = log()
+
+class RecorderLoad:
+    """录播机负载"""
+
+    def __init__(self, rec_type: str, rec_name: str, rooms: int = 0, recording: int = 0,
+                 bitrate: float = 0.0, disk: float = 0.0, online: bool = True):
+        """
+        :param rooms: 直播间数量
+        :param recording: 正在录制的直播间数量
+        :param bitrate: 网络下载速率 (Mbps)
+        :param disk: 磁盘写入速率 (MB/s)
+        :param online: 录播机是否在线
+        """
+        self.rec_type = rec_type
+        self.rec_name = rec_name
+        self.rooms = rooms
+        self.recording = recording
+        self.bitrate = bitrate
+        self.disk = disk
+        self.online = online
+
+    def to_dict(self) -> Dict:
+        return {
+            "recName": self.rec_name,
+            "recType": self.rec_type,
+            "rooms": self.rooms,
+            "recording": self.recording,
+            "bitrate": round(self.bitrate, 3),
+            "disk": round(self.disk, 3),
+            "online": self.online
+        }
+
+class PlacementPolicy(ABC):
+    """分配策略基类"""
+
+    name = ""
+
+    def __init__(self, options: Dict):
+        self.options = options
+
+    @abstractmethod
+    def score(self, load: RecorderLoad) -> float:
+        """负载评分，越小越优先"""
+
+    def choose(self, room_id: int, candidates: List[RecorderLoad]) -> Tuple[RecorderLoad, str]:
+        """
+        选择目标录播机
+        :return: (目标录播机, 选择原因)
+        """
+        target = min(candidates, key=lambda load: (self.score(load), load.rec_name))
+        return target, f"负载评分最低 ({self.score(target):.2f})"
+
+class LeastLoadedPolicy(PlacementPolicy):
+    """按直播间数量、录制数量和网络/磁盘速率加权计算负载，选择负载最低的录播机"""
+
+    name = "least-loaded"
+    default_weights = {"ROOMS": 1.0, "RECORDING": 2.0, "BITRATE": 0.1, "DISK": 0.5}
+
+    def __init__(self, options: Dict):
+        super().__init__(options)
+        self.weights = dict(self.default_weights, **(options.get("LOAD_WEIGHTS") or {}))
+
+    def score(self, load: RecorderLoad) -> float:
+        return (
+            load.rooms * self.weights["ROOMS"]
+            + load.recording * self.weights["RECORDING"]
+            + load.bitrate * self.weights["BITRATE"]
+            + load.disk * self.weights["DISK"]
+        )
+
+class WeightedPolicy(LeastLoadedPolicy):
+    """按录播机容量权重分配，权重越大分到的直播间越多"""
+
+    name = "weighted"
+
+    def score(self, load: RecorderLoad) -> float:
+        weight = (self.options.get("WEIGHTS") or {}).get(load.rec_name, 1)
+        if not weight or weight <= 0:
+            return float("inf")
+        return (super().score(load) + 1) / weight
+
+class PinnedPolicy(LeastLoadedPolicy):
+    """指定直播间固定分配到某个录播机，未指定的直播间按负载分配"""
+
+    name = "pinned"
+
+    def choose(self, room_id: int, candidates: List[RecorderLoad]) -> Tuple[RecorderLoad, str]:
+        pins = self.options.get("PINS") or {}
+        pinned = pins.get(room_id, pins.get(str(room_id)))
+        if pinned:
+            for load in candidates:
+                if load.rec_name == pinned:
+                    return load, f"直播间固定分配到 {pinned}"
+            logger.warning(f"[分配] 直播间 {room_id} 固定的录播机 {pinned} 不可用，按负载分配")
+        return super().choose(room_id, candidates)
+
+POLICIES = {}
+
+def register_policy(policy_class: type):
+    """注册分配策略"""
+    POLICIES[policy_class.name] = policy_class
+    return policy_class
+
+for _policy in (LeastLoadedPolicy, WeightedPolicy, PinnedPolicy):
+    register_policy(_policy)
+
+class PlacementEngine:
+    """新建直播间时选择目标录播机"""
+
+    def __init__(self, options: Dict = None):
+        """
+        :param options: PLACEMENT 配置
+        """
+        options = options or {}
+        self.enabled = options.get("ENABLE", True)
+        policy_name = options.get("POLICY", LeastLoadedPolicy.name)
+        if policy_name not in POLICIES:
+            logger.warning(f"[分配] 未知的分配策略 {policy_name}，使用 {LeastLoadedPolicy.name}")
+            policy_name = LeastLoadedPolicy.name
+        self.policy = POLICIES[policy_name](options)
+        logger.debug(f"[分配] 分配策略: {self.policy.name}，{'启用' if self.enabled else '禁用'}")
+
+    def place(self, room_id: int, candidates: List[RecorderLoad]) -> Optional[Dict]:
+        """
+        为直播间选择目标录播机
+        :param room_id: 房间号
+        :param candidates: 可用录播机的负载
+        :return: 分配结果，没有可用录播机时返回 None
+        """
+        online = [load for load in candidates if load.online]
+        if not online:
+            return None
+
+        target, reason = self.policy.choose(room_id, online)
+        logger.debug(f"[分配] 直播间 {room_id} 分配到 {target.rec_name}: {reason}")
+        return {
+            "policy": self.policy.name,
+            "recName": target.rec_name,
+            "recType": target.rec_type,
+            "reason": reason,
+            "candidates": [
+                dict(load.to_dict(), score=round(self.policy.score(load), 3))
+                for load in candidates
+            ]
+        }
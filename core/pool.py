@@ -0,0 +1,31 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict
+
+## 每个录播机地址共用一个 Session，复用连接
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+def get_session(host: str, pool_size: int = 10) -> requests.Session:
+    """
+    获取录播机地址的连接池
+    :param host: 录播机地址
+    :param pool_size: 保持的连接数量
+    """
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = _sessions[host] = requests.Session()
+            session.trust_env = False
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(int(pool_size or 0), 1))
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        return session
+
+def close_sessions():
+    """关闭所有连接池"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,234 @@
+import asyncio, copy, uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple, Union
+from core.logs import log
+from core.recheme import RechemeAPI
+from core.blrec import BLRECAPI
+from core.placement import PlacementPolicy, RecorderLoad
+from core.state import RoomStateStore
+
+logger = log()
+
+def _room_load(load: RecorderLoad, view: Dict, sign: int):
+    """将单个直播间计入或移出录播机负载"""
+    load.rooms += sign
+    load.recording += sign if view["recording"] else 0
+    load.bitrate += sign * view["bitrate"]
+    load.disk += sign * view["disk"]
+
+def plan_moves(loads: List[RecorderLoad], rooms: Dict[Tuple[str, str], List[Dict]], policy: PlacementPolicy,
+               max_moves: int = 50, include_recording: bool = False) -> List[Dict]:
+    """
+    计算迁移计划，每次从负载评分最高的录播机迁移一个直播间到评分最低的录播机，直到无法继续改善
+    :param loads: 可参与迁移的录播机负载
+    :param rooms: (录播类型, 录播机名称) -> 直播间列表 (room_view 格式)
+    :param policy: 负载评分策略
+    :param max_moves: 最大迁移数量
+    :param include_recording: 是否迁移正在录制的直播间，迁移会中断录制
+    :return: 迁移计划
+    """
+    loads = {(load.rec_type, load.rec_name): copy.copy(load) for load in loads if load.online}
+    room_ids = {key: {view["roomId"] for view in rooms.get(key, [])} for key in loads}
+    pins = policy.options.get("PINS") or {}
+    movable = {
+        key: sorted(
+            (
+                view for view in rooms.get(key, [])
+                if (include_recording or not view["recording"])
+                and view["roomId"] not in pins and str(view["roomId"]) not in pins
+            ),
+            key=lambda view: (view["bitrate"], view["disk"])
+        )
+        for key in loads
+    }
+
+    moves = []
+    while len(moves) < max_moves and len(loads) > 1:
+        ranked = sorted(loads.values(), key=lambda load: (policy.score(load), load.rec_name, load.rec_type))
+        target, source = ranked[0], ranked[-1]
+        source_score = policy.score(source)
+
+        chosen = None
+        source_key, target_key = (source.rec_type, source.rec_name), (target.rec_type, target.rec_name)
+        for view in movable[source_key]:
+            if view["roomId"] in room_ids[target_key]:
+                continue
+            _room_load(source, view, -1)
+            _room_load(target, view, 1)
+            if policy.score(target) <= policy.score(source) and policy.score(target) < source_score:
+                chosen = view
+                break
+            _room_load(source, view, 1)
+            _room_load(target, view, -1)
+
+        if chosen is None:
+            break
+
+        movable[source_key].remove(chosen)
+        room_ids[source_key].discard(chosen["roomId"])
+        room_ids[target_key].add(chosen["roomId"])
+        moves.append({
+            "roomId": chosen["roomId"],
+            "from": {"recName": source.rec_name, "recType": source.rec_type},
+            "to": {"recName": target.rec_name, "recType": target.rec_type},
+            "autoRecord": chosen["autoRecord"],
+            "status": "pending",
+            "error": None
+        })
+    return moves
+
+class RebalanceOperation:
+    """一次迁移操作"""
+
+    def __init__(self, moves: List[Dict], user: str = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.moves = moves
+        self.user = user
+        self.status = "pending"
+        self.created_at = datetime.now()
+        self.finished_at = None
+
+    def progress(self) -> Dict:
+        """获取迁移进度"""
+        count = {}
+        for move in self.moves:
+            count[move["status"]] = count.get(move["status"], 0) + 1
+        return {
+            "id": self.id,
+            "status": self.status,
+            "total": len(self.moves),
+            "succeeded": count.get("succeeded", 0),
+            "failed": count.get("failed", 0),
+            "skipped": count.get("skipped", 0),
+            "pending": count.get("pending", 0) + count.get("running", 0),
+            "rolledBack": count.get("rolled_back", 0),
+            "createdAt": self.created_at.isoformat(timespec="seconds"),
+            "finishedAt": self.finished_at.isoformat(timespec="seconds") if self.finished_at else None,
+            "moves": self.moves
+        }
+
+class Rebalancer:
+    """执行直播间迁移：先在目标录播机创建并确认，再从原录播机删除"""
+
+    def __init__(self, clients_for: Callable[[str, str], List[Union[RechemeAPI, BLRECAPI]]],
+                 state_store: RoomStateStore, concurrency: int = 2, keep: int = 20):
+        """
+        :param clients_for: 根据 (录播类型, 录播机名称) 获取 API 实例列表
+        :param state_store: 直播间状态汇总
+        :param concurrency: 同时进行的迁移数量
+        :param keep: 保留的历史操作数量
+        """
+        self.clients_for = clients_for
+        self.state_store = state_store
+        self.concurrency = max(int(concurrency), 1)
+        self.keep = keep
+        self.operations: Dict[str, RebalanceOperation] = {}
+
+    def create_operation(self, moves: List[Dict], user: str = None) -> RebalanceOperation:
+        """创建迁移操作"""
+        operation = RebalanceOperation(moves, user)
+        self.operations[operation.id] = operation
+        while len(self.operations) > self.keep:
+            del self.operations[next(iter(self.operations))]
+        return operation
+
+    @staticmethod
+    def _room_arg(client: Union[RechemeAPI, BLRECAPI], room_id: int):
+        return str(room_id) if client.rec_type == "blrec" else room_id
+
+    async def _delete(self, clients: List[Union[RechemeAPI, BLRECAPI]], room_id: int) -> bool:
+        results = await asyncio.gather(*(
+            asyncio.to_thread(client.delete_room, self._room_arg(client, room_id)) for client in clients
+        ))
+        for client, result in zip(clients, results):
+            if result is not None:
+                self.state_store.remove_room(client.rec_type, client.name, client.host, room_id)
+        return all(result is not None for result in results)
+
+    async def _move(self, room_id: int, source: Dict, target: Dict, auto_record: bool = True) -> str:
+        """
+        迁移单个直播间，保留自动录制开关，同类型录播机之间同时复制直播间设置
+        :param auto_record: 是否启用自动录制
+        :return: 失败原因，成功时返回 None
+        """
+        sources = self.clients_for(source["recType"], source["recName"])
+        targets = self.clients_for(target["recType"], target["recName"])
+        if not sources or not targets:
+            return "录播机不存在"
+
+        room_config = None
+        if source["recType"] == target["recType"]:
+            room_config = await asyncio.to_thread(sources[0].get_room_config, str(room_id), True)
+            if room_config is None:
+                return f"获取 {source['recName']} 的直播间设置失败"
+
+        created = []
+        for client in targets:
+            data = await asyncio.to_thread(client.create_room, room_id, auto_record)
+            if not data:
+                break
+            created.append(client)
+        if len(created) != len(targets):
+            await self._delete(created, room_id)
+            return f"在 {target['recName']} 创建直播间失败"
+
+        confirmed = await asyncio.gather(*(asyncio.to_thread(client.get_room, str(room_id)) for client in created))
+        if not all(confirmed):
+            await self._delete(created, room_id)
+            return f"在 {target['recName']} 未能确认直播间"
+        for client, data in zip(created, confirmed):
+            self.state_store.update_room(client.rec_type, client.name, client.host, data)
+
+        if room_config is not None:
+            results = await asyncio.gather(*(
+                asyncio.to_thread(client.update_room_config, self._room_arg(client, room_id), room_config) for client in created
+            ))
+            if not all(result is not None for result in results):
+                await self._delete(created, room_id)
+                return f"复制直播间设置到 {target['recName']} 失败"
+
+        if not await self._delete(sources, room_id):
+            await self._delete(created, room_id)
+            return f"从 {source['recName']} 删除直播间失败"
+        return None
+
+    async def execute(self, operation: RebalanceOperation, rollback: bool = True):
+        """
+        执行迁移操作
+        :param rollback: 出现失败时是否撤销本次已完成的迁移
+        """
+        operation.status = "running"
+        semaphore = asyncio.Semaphore(self.concurrency)
+        failed = asyncio.Event()
+        logger.info(f"[迁移] 操作 {operation.id} 开始，共 {len(operation.moves)} 个直播间")
+
+        async def run(move: Dict):
+            async with semaphore:
+                if rollback and failed.is_set():
+                    move["status"] = "skipped"
+                    return
+                move["status"] = "running"
+                error = await self._move(move["roomId"], move["from"], move["to"], move.get("autoRecord", True))
+                move["status"] = "failed" if error else "succeeded"
+                move["error"] = error
+                if error:
+                    failed.set()
+                    logger.error(f"[迁移] 直播间 {move['roomId']} 迁移失败: {error}")
+
+        await asyncio.gather(*(run(move) for move in operation.moves))
+
+        if rollback and failed.is_set():
+            logger.warning(f"[迁移] 操作 {operation.id} 出现失败，撤销已完成的迁移")
+            for move in reversed([move for move in operation.moves if move["status"] == "succeeded"]):
+                error = await self._move(move["roomId"], move["to"], move["from"], move.get("autoRecord", True))
+                if error:
+                    move["error"] = f"撤销失败: {error}"
+                    logger.error(f"[迁移] 直播间 {move['roomId']} 撤销失败: {error}")
+                else:
+                    move["status"] = "rolled_back"
+            operation.status = "rolled_back"
+        else:
+            operation.status = "failed" if failed.is_set() else "completed"
+
+        operation.finished_at = datetime.now()
+        logger.info(f"[迁移] 操作 {operation.id} 结束: {operation.status}")
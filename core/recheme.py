@@ -1,13 +1,20 @@
-import requests, base64
-from typing import Dict, List, Optional, Union
+import copy, requests, base64
+from typing import Dict, List, Optional, Tuple, Union
 from core.logs import log, log_print
+from core.shaping import UpstreamLimiter, get_limiter
+from core.retry import RETRYABLE_STATUS, call_with_retry, idempotent_call, mark_unavailable, shared_call
+from core.timeouts import TimeoutPolicy, get_timeout_policy
+from core.pool import get_session
+from core.cache import room_config_cache
 
 logger = log()
 
 class RechemeAPI:
     """录播姬 API"""
+
+    rec_type = "recheme"
     
-    def __init__(self, host: str, name: str, basic_auth: bool = False, username: str = "", password: str = "", manage: bool = True):
+    def __init__(self, host: str, name: str, basic_auth: bool = False, username: str = "", password: str = "", manage: bool = True, limiter: UpstreamLimiter = None, timeouts: TimeoutPolicy = None, session: requests.Session = None):
         """
         初始化录播姬 API
         :param host: 录播姬服务器地址
@@ -16,12 +23,16 @@ class RechemeAPI:
         :param username: Basic 认证用户名
         :param password: Basic 认证密码
         :param manage: 是否允许管理操作
+        :param limiter: 请求限流器，不指定时使用该地址的默认限流器
+        :param timeouts: 超时策略，不指定时使用该地址的默认超时
+        :param session: 连接池，不指定时使用该地址共用的连接池
         """
         self.host = host.rstrip('/')
         self.name = name
         self.manage = manage
-        self.session = requests.Session()
-        self.session.trust_env = False
+        self.limiter = limiter or get_limiter(self.host)
+        self.timeouts = timeouts or get_timeout_policy(self.host)
+        self.session = session or get_session(self.host, self.limiter.max_concurrency or 10)
         self.headers = {}
         
         if basic_auth and username and password:
@@ -30,35 +41,63 @@ class RechemeAPI:
             self.headers["Authorization"] = f"Basic {encoded_credentials}"
             logger.debug(f"[录播姬] {self.name} Basic认证已配置")
 
-    def _make_request(self, endpoint: str, method: str = "GET", json: Dict = None) -> Optional[Union[Dict, List]]:
+    def _make_request(self, endpoint: str, method: str = "GET", json: Dict = None, op: str = None) -> Optional[Union[Dict, List]]:
         """
         发送 HTTP 请求到录播姬 API
         :param endpoint: API 端点
         :param method: HTTP 方法
         :param json: POST 请求的 JSON 数据
+        :param op: 操作类型 read / control / mutate，决定重试策略，默认 GET 为 read，其他为 control
         :return: API 响应数据
         """
+        op = op or ("read" if method == "GET" else "control")
+        if op == "read":
+            key = (self.host, endpoint, tuple(sorted(self.headers.items())))
+            return shared_call(key, self._send_with_retry, endpoint, method, json, op)
+        if op == "mutate":
+            return idempotent_call(self.host, method, endpoint, json, lambda: self._send_with_retry(endpoint, method, json, op))
+        return self._send_with_retry(endpoint, method, json, op)
+
+    def _send_with_retry(self, endpoint: str, method: str, json: Dict, op: str) -> Optional[Union[Dict, List]]:
+        """按重试策略发送请求"""
+        return call_with_retry(self.host, op, f"{method} {endpoint}", lambda: self._send_request(endpoint, method, json))
+
+    def _send_request(self, endpoint: str, method: str = "GET", json: Dict = None) -> Tuple[Optional[Union[Dict, List]], bool]:
+        """
+        实际发送一次请求
+        :return: (API 响应数据, 失败时是否可以重试)
+        """
         url = f"{self.host}/api/{endpoint}"
         try:
-            response = self.session.request(method, url, headers=self.headers, json=json, timeout=3)
+            with self.limiter.acquire(), self.timeouts.measure(endpoint) as timeout:
+                response = self.session.request(method, url, headers=self.headers, json=json, timeout=timeout)
             if response.status_code in [200, 201]:
                 data = response.json()
-                return data
+                return data, False
             else:
                 log_print(f"[录播姬] {self.name} 请求失败，状态码: {response.status_code}, URL: {url}", "ERROR")
-                return None
+                if response.status_code >= 500:
+                    mark_unavailable()
+                return None, response.status_code in RETRYABLE_STATUS
         except requests.exceptions.Timeout:
             log_print(f"[录播姬] {self.name} 请求超时, URL: {url}", "ERROR")
-            return None
+            return None, True
+        except requests.exceptions.ConnectionError as e:
+            log_print(f"[录播姬] {self.name} 连接失败: {e}, URL: {url}", "ERROR")
+            return None, True
         except Exception as e:
             log_print(f"[录播姬] {self.name} 请求异常: {e}, URL: {url}", "ERROR")
-            return None
+            return None, False
 
     def get_rooms(self) -> List[Dict]:
         """获取所有直播间信息"""
+        return self.fetch_rooms() or []
+
+    def fetch_rooms(self) -> Optional[List[Dict]]:
+        """获取所有直播间信息，请求失败时返回 None"""
         data = self._make_request("room")
-        if not data:
-            return []
+        if not isinstance(data, list):
+            return None
             
         for item in data:
             item["recServer"] = {
@@ -100,12 +139,21 @@ class RechemeAPI:
         """
         return self._make_request(f"room/{room_id}/iostats")
 
-    def get_room_config(self, room_id: str) -> Optional[Dict]:
+    def get_room_config(self, room_id: str, refresh: bool = False) -> Optional[Dict]:
         """
-        获取直播间设置
+        获取直播间设置，优先使用缓存
         :param room_id: 房间号
+        :param refresh: 是否跳过缓存重新获取
         """
-        return self._make_request(f"room/{room_id}/config")
+        key = (self.rec_type, self.host, str(room_id))
+        if not refresh:
+            cached = room_config_cache.get(key)
+            if cached is not None:
+                return copy.deepcopy(cached)
+        data = self._make_request(f"room/{room_id}/config")
+        if data is not None:
+            room_config_cache.set(key, copy.deepcopy(data))
+        return data
 
     def _check_manage_permission(self, operation: str) -> bool:
         """检查是否有管理权限"""
@@ -127,7 +175,7 @@ class RechemeAPI:
             "roomId": room_id,
             "autoRecord": auto_record
         }
-        response = self._make_request("room", method="POST", json=data)
+        response = self._make_request("room", method="POST", json=data, op="mutate")
         if response:
             response["recServer"] = {
                 "recName": self.name,
@@ -146,7 +194,13 @@ class RechemeAPI:
         """
         if not self._check_manage_permission("修改设置"):
             return None
-        return self._make_request(f"room/{room_id}/config", method="POST", json=config)
+        response = self._make_request(f"room/{room_id}/config", method="POST", json=config)
+        if isinstance(response, dict):
+            # 录播姬返回修改后的完整设置，直接更新缓存
+            room_config_cache.set((self.rec_type, self.host, str(room_id)), copy.deepcopy(response))
+        else:
+            room_config_cache.invalidate((self.rec_type, self.host, str(room_id)))
+        return response
 
     def start_recording(self, room_id: int) -> Optional[Dict]:
         """
@@ -196,4 +250,7 @@ class RechemeAPI:
         """
         if not self._check_manage_permission("删除房间"):
             return None
-        return self._make_request(f"room/{room_id}", method="DELETE") 
\ No newline at end of file
+        response = self._make_request(f"room/{room_id}", method="DELETE", op="mutate")
+        # 重新添加的直播间不应使用旧的设置
+        room_config_cache.invalidate((self.rec_type, self.host, str(room_id)))
+        return response
\ No newline at end of file
@@ -0,0 +1,205 @@
+import time, threading, contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Tuple, Union
+from core.logs import log
+from core.recheme import RechemeAPI
+from core.blrec import BLRECAPI
+from core.cache import room_config_cache
+from core.retry import mark_unavailable, reset_unavailable, upstream_unavailable
+
+logger = log()
+
+## 只读方法，可以同时请求多个线路
+READ_METHODS = {
+    "get_rooms", "fetch_rooms", "get_room", "get_room_stats",
+    "get_room_iostats", "get_room_status", "get_room_config"
+}
+
+## 对冲请求线程池
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="replica")
+
+class ReplicaHealth:
+    """同一录播机各线路的健康状态"""
+
+    def __init__(self, cooldown: float = 30, alpha: float = 0.3):
+        """
+        :param cooldown: 线路失败后降低优先级的时间(秒)
+        :param alpha: 延迟滑动平均系数
+        """
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self._latency: Dict[str, float] = {}
+        self._down_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def success(self, host: str, latency: float):
+        with self._lock:
+            previous = self._latency.get(host)
+            self._latency[host] = latency if previous is None else previous + self.alpha * (latency - previous)
+            self._down_until.pop(host, None)
+
+    def failure(self, host: str):
+        with self._lock:
+            if host not in self._down_until:
+                logger.warning(f"[线路] {host} 请求失败，暂时降低优先级")
+            self._down_until[host] = time.monotonic() + self.cooldown
+
+    def order(self, clients: List[Union[RechemeAPI, BLRECAPI]]) -> List[Union[RechemeAPI, BLRECAPI]]:
+        """按健康状态和延迟排序，未测量过的线路按配置顺序优先尝试"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                client for _, client in sorted(
+                    enumerate(clients),
+                    key=lambda item: (
+                        self._down_until.get(item[1].host, 0) > now,
+                        self._latency.get(item[1].host, 0),
+                        item[0]
+                    )
+                )
+            ]
+
+    def stats(self) -> Dict[str, Dict]:
+        now = time.monotonic()
+        with self._lock:
+            hosts = set(self._latency) | set(self._down_until)
+            return {
+                host: {
+                    "latency": round(self._latency[host], 4) if host in self._latency else None,
+                    "healthy": self._down_until.get(host, 0) <= now
+                }
+                for host in hosts
+            }
+
+_health: Dict[Tuple[str, str], ReplicaHealth] = {}
+_health_lock = threading.Lock()
+
+def get_replica_health(rec_type: str, rec_name: str, cooldown: float = 30) -> ReplicaHealth:
+    """获取录播机的线路健康状态，同一录播机共用一个"""
+    with _health_lock:
+        health = _health.get((rec_type, rec_name))
+        if health is None:
+            health = _health[(rec_type, rec_name)] = ReplicaHealth(cooldown)
+        health.cooldown = cooldown
+        return health
+
+def replica_stats() -> Dict[str, Dict]:
+    """获取所有多线路录播机的线路状态"""
+    with _health_lock:
+        items = list(_health.items())
+    return {f"{rec_type}/{rec_name}": health.stats() for (rec_type, rec_name), health in items}
+
+class ReplicaClient:
+    """
+    将同一名称下的多个地址视为同一录播机的不同线路
+    读取请求发送到最快的健康线路，超过对冲延迟未响应时同时请求下一条线路，失败时切换线路；
+    写入请求只发送到一条线路，开始/停止录制等可重复执行的请求失败时切换线路
+    """
+
+    def __init__(self, clients: List[Union[RechemeAPI, BLRECAPI]], hedge_delay: float = 0.5, cooldown: float = 30):
+        """
+        :param clients: 同一录播机各线路的 API 实例
+        :param hedge_delay: 对冲请求延迟(秒)
+        :param cooldown: 线路失败后降低优先级的时间(秒)
+        """
+        self.clients = clients
+        self.hedge_delay = hedge_delay
+        self.name = clients[0].name
+        self.rec_type = clients[0].rec_type
+        self.host = clients[0].host
+        self.manage = clients[0].manage
+        self.health = get_replica_health(self.rec_type, self.name, cooldown)
+
+    def _call(self, client: Union[RechemeAPI, BLRECAPI], method: str, args: tuple, kwargs: dict) -> Tuple[Any, bool]:
+        """
+        调用单条线路，只有连接失败、超时、5xx 才算作线路失败，直播间不存在等正常响应不影响线路状态
+        :return: (结果, 线路是否不可用)
+        """
+        start = time.monotonic()
+        reset_unavailable()
+        try:
+            result = getattr(client, method)(*args, **kwargs)
+            unavailable = result is None and upstream_unavailable()
+        except Exception as e:
+            logger.error(f"[线路] {client.name} {client.host} 调用 {method} 异常: {e}")
+            result, unavailable = None, True
+        if unavailable:
+            self.health.failure(client.host)
+        elif result is not None:
+            self.health.success(client.host, time.monotonic() - start)
+        return result, unavailable
+
+    def _hedged(self, method: str, args: tuple, kwargs: dict) -> Any:
+        """对冲读取，返回最先成功的结果"""
+        pending = self.health.order(self.clients)
+        futures = {}
+
+        def launch():
+            client = pending.pop(0)
+            # 在线程池中保留调用方的上下文，如幂等键与轮询请求配额
+            context = contextvars.copy_context()
+            futures[_executor.submit(context.run, self._call, client, method, args, kwargs)] = client
+
+        launch()
+        while futures:
+            done, _ = wait(futures, timeout=self.hedge_delay if pending else None, return_when=FIRST_COMPLETED)
+            if not done:
+                logger.debug(f"[线路] {self.name} {method} 超过 {self.hedge_delay} 秒未响应，同时请求下一条线路")
+                launch()
+                continue
+            for future in done:
+                futures.pop(future)
+                result, unavailable = future.result()
+                if not unavailable:
+                    # 线路正常响应，直播间不存在等结果不再请求其他线路
+                    reset_unavailable()
+                    return result
+                if pending:
+                    launch()
+        mark_unavailable()
+        return None
+
+    def _failover(self, method: str, args: tuple, kwargs: dict, retry: bool) -> Any:
+        """依次尝试各线路"""
+        for client in self.health.order(self.clients):
+            result, unavailable = self._call(client, method, args, kwargs)
+            if not unavailable or not retry:
+                if unavailable:
+                    mark_unavailable()
+                else:
+                    reset_unavailable()
+                return result
+        mark_unavailable()
+        return None
+
+    def fetch_rooms(self, *args, **kwargs):
+        return self._hedged("fetch_rooms", args, kwargs)
+
+    def get_rooms(self, *args, **kwargs):
+        return self.fetch_rooms(*args, **kwargs) or []
+
+    def update_room_config(self, room_id, config: Dict):
+        result = self._failover("update_room_config", (room_id, config), {}, True)
+        # 其他线路缓存的设置也已过期
+        for client in self.clients:
+            room_config_cache.invalidate((client.rec_type, client.host, str(room_id)))
+        return result
+
+    def delete_room(self, room_id):
+        result = self._failover("delete_room", (room_id,), {}, False)
+        for client in self.clients:
+            room_config_cache.invalidate((client.rec_type, client.host, str(room_id)))
+        return result
+
+    def _make_request(self, endpoint: str, method: str = "GET", *args, **kwargs):
+        if method == "GET":
+            return self._hedged("_make_request", (endpoint, method) + args, kwargs)
+        return self._failover("_make_request", (endpoint, method) + args, kwargs, kwargs.get("op") != "mutate")
+
+    def __getattr__(self, item: str):
+        attr = getattr(self.clients[0], item)
+        if not callable(attr):
+            return attr
+        if item in READ_METHODS:
+            return lambda *args, **kwargs: self._hedged(item, args, kwargs)
+        return lambda *args, **kwargs: self._failover(item, args, kwargs, item not in ["create_room", "delete_room"])
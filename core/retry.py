@@ -0,0 +1,196 @@
+import copy, json, random, time, threading
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from core.cache import TTLCache
+from core.logs import log
+from core.singleflight import upstream_flight
+
+logger = log()
+
+## 当前请求的幂等键，来自面板请求头 Idempotency-Key
+idempotency_key: ContextVar[Optional[str]] = ContextVar("idempotency_key", default=None)
+
+## 当前线程最近一次录播机请求是否因录播机不可用(连接失败、超时、5xx)而失败
+## 用于区分不可用与正常的失败响应，如直播间不存在时的 404
+_upstream_state = threading.local()
+
+def mark_unavailable():
+    """标记当前线程的请求因录播机不可用而失败"""
+    _upstream_state.unavailable = True
+
+def reset_unavailable():
+    """清除当前线程的不可用标记"""
+    _upstream_state.unavailable = False
+
+def upstream_unavailable() -> bool:
+    """当前线程最近一次录播机请求是否因录播机不可用而失败"""
+    return getattr(_upstream_state, "unavailable", False)
+
+def shared_call(key: Any, func: Callable, *args) -> Any:
+    """合并相同的并发请求，等待方同时获得录播机是否不可用"""
+    def run():
+        result = func(*args)
+        return result, upstream_unavailable()
+
+    result, unavailable = upstream_flight.do(key, run)
+    _upstream_state.unavailable = unavailable
+    return result
+
+class RetryPolicy:
+    """重试策略，指数退避加随机抖动"""
+
+    def __init__(self, attempts: int = 3, base_delay: float = 0.2, max_delay: float = 2.0):
+        """
+        :param attempts: 最大尝试次数(含第一次)
+        :param base_delay: 退避基准时间(秒)
+        :param max_delay: 最大退避时间(秒)
+        """
+        self.attempts = max(int(attempts), 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """第 attempt 次失败后的等待时间"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+## 可以重试的 HTTP 状态码
+RETRYABLE_STATUS = [429, 502, 503, 504]
+
+## 按操作类型区分的重试策略
+##   read: 只读请求
+##   control: 可重复执行的控制请求，如开始/停止录制、分段、刷新、修改设置
+##   mutate: 创建/删除，不重试，通过幂等键去重
+RETRY_POLICIES = {
+    "read": RetryPolicy(3),
+    "control": RetryPolicy(3),
+    "mutate": RetryPolicy(1)
+}
+
+class RetryBudget:
+    """重试预算，成功请求积累额度，每次重试消耗额度，避免录播机故障时重试风暴"""
+
+    def __init__(self, ratio: float = 0.1, max_tokens: float = 10):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def deposit(self, host: str):
+        with self._lock:
+            self._tokens[host] = min(self.max_tokens, self._tokens.get(host, self.max_tokens) + self.ratio)
+
+    def withdraw(self, host: str) -> bool:
+        with self._lock:
+            tokens = self._tokens.get(host, self.max_tokens)
+            if tokens < 1:
+                return False
+            self._tokens[host] = tokens - 1
+            return True
+
+retry_budget = RetryBudget()
+
+class AttemptLog:
+    """记录最近的请求尝试"""
+
+    def __init__(self, size: int = 500):
+        self._records = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, host: str, op: str, request: str, attempt: int, success: bool, latency: float, error: str = None):
+        with self._lock:
+            self._records.append({
+                "time": datetime.now().isoformat(timespec="milliseconds"),
+                "host": host,
+                "op": op,
+                "request": request,
+                "attempt": attempt,
+                "success": success,
+                "latency": round(latency, 4),
+                "error": error
+            })
+
+    def recent(self, limit: int = 100, host: str = None, failed_only: bool = False) -> List[Dict]:
+        with self._lock:
+            records = list(self._records)
+        if host:
+            records = [record for record in records if record["host"] == host]
+        if failed_only:
+            records = [record for record in records if not record["success"]]
+        return records[-limit:][::-1]
+
+attempt_log = AttemptLog()
+
+## 已完成的带幂等键请求结果
+idempotency_cache = TTLCache(600)
+
+def configure_retry(options: Dict):
+    """
+    根据 RETRY 配置更新重试策略
+    :param options: {"READ": {"ATTEMPTS": 3, ...}, "CONTROL": {...}, "IDEMPOTENCY_TTL": 600}
+    """
+    for op in ["read", "control"]:
+        policy_options = options.get(op.upper()) or {}
+        RETRY_POLICIES[op] = RetryPolicy(
+            policy_options.get("ATTEMPTS", 3),
+            policy_options.get("BASE_DELAY", 0.2),
+            policy_options.get("MAX_DELAY", 2.0)
+        )
+    idempotency_cache.ttl = options.get("IDEMPOTENCY_TTL", 600)
+
+def call_with_retry(host: str, op: str, request: str, send: Callable[[], Tuple[Any, bool]]) -> Any:
+    """
+    按操作类型的重试策略发送请求
+    :param host: 录播机地址
+    :param op: 操作类型 read / control / mutate
+    :param request: 请求描述，用于日志
+    :param send: 发送一次请求，返回 (响应数据, 是否可以重试)
+    :return: 响应数据，全部尝试失败时返回 None
+    """
+    policy = RETRY_POLICIES.get(op, RETRY_POLICIES["read"])
+    for attempt in range(1, policy.attempts + 1):
+        start = time.monotonic()
+        reset_unavailable()
+        data, retryable = send()
+        success = data is not None
+        if not success and retryable:
+            mark_unavailable()
+        attempt_log.record(host, op, request, attempt, success, time.monotonic() - start,
+                           None if success else ("可重试" if retryable else "不可重试"))
+        if success:
+            if attempt == 1:
+                retry_budget.deposit(host)
+            return data
+        if not retryable or attempt == policy.attempts:
+            return None
+        if not retry_budget.withdraw(host):
+            logger.warning(f"[重试] {host} 重试预算已用完，放弃重试 {request}")
+            return None
+        delay = policy.delay(attempt)
+        logger.debug(f"[重试] {host} {request} 第 {attempt} 次失败，{delay:.2f} 秒后重试")
+        time.sleep(delay)
+    return None
+
+def idempotent_call(host: str, method: str, endpoint: str, body: Any, call: Callable[[], Any]) -> Any:
+    """
+    创建/删除请求去重
+    相同的请求同时只发送一次；带幂等键的请求在有效期内直接返回上次成功的结果
+    """
+    key = idempotency_key.get()
+    body_key = json.dumps(body, sort_keys=True, default=str)
+    if key:
+        # 幂等键会被批量/导入/后台任务中的每个请求继承，需要同时区分请求内容
+        flight_key = ("idempotency", host, method, endpoint, body_key, key)
+        cached = idempotency_cache.get(flight_key)
+        if cached is not None:
+            logger.debug(f"[重试] 幂等键 {key} 命中，跳过 {method} {endpoint}")
+            reset_unavailable()
+            return copy.deepcopy(cached)
+    else:
+        flight_key = ("mutate", host, method, endpoint, body_key)
+
+    result = shared_call(flight_key, call)
+    if key and result is not None:
+        idempotency_cache.set(flight_key, copy.deepcopy(result))
+    return result
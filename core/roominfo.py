@@ -0,0 +1,58 @@
+from typing import Dict, Optional
+
+def room_id_of(room: Dict) -> Optional[int]:
+    """
+    获取直播间房间号，兼容录播姬与 BLREC 的数据格式
+    :param room: 直播间信息
+    :return: 房间号
+    """
+    if not isinstance(room, dict):
+        return None
+    room_id = room.get("roomId")
+    if room_id is None:
+        room_id = (room.get("room_info") or {}).get("room_id")
+    try:
+        return int(room_id) if room_id is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def room_view(room: Dict) -> Optional[Dict]:
+    """
+    提取直播间的通用字段，兼容录播姬与 BLREC 的数据格式
+    :param room: 直播间信息
+    :return: roomId / name / title / area / live / recording / autoRecord / bitrate(网络 Mbps) / disk(磁盘 MB/s)
+    """
+    room_id = room_id_of(room)
+    if room_id is None:
+        return None
+
+    if "room_info" in room:
+        user_info = room.get("user_info") or {}
+        room_info = room.get("room_info") or {}
+        task_status = room.get("task_status") or {}
+        area = [room_info.get("parent_area_name"), room_info.get("area_name")]
+        return {
+            "roomId": room_id,
+            "name": user_info.get("name") or "",
+            "title": room_info.get("title") or "",
+            "area": " ".join(a for a in area if a),
+            "live": room_info.get("live_status") == 1,
+            "recording": task_status.get("running_status") == "recording",
+            "autoRecord": bool(task_status.get("recorder_enabled")),
+            "bitrate": (task_status.get("dl_rate") or 0) * 8 / 1000 / 1000,
+            "disk": (task_status.get("rec_rate") or 0) / 1024 / 1024
+        }
+
+    io_stats = room.get("ioStats") or {}
+    area = [room.get("areaNameParent"), room.get("areaNameChild")]
+    return {
+        "roomId": room_id,
+        "name": room.get("name") or "",
+        "title": room.get("title") or "",
+        "area": " ".join(a for a in area if a),
+        "live": bool(room.get("streaming")),
+        "recording": bool(room.get("recording")),
+        "autoRecord": bool(room.get("autoRecord")),
+        "bitrate": io_stats.get("networkMbps") or 0,
+        "disk": io_stats.get("diskMBps") or 0
+    }
@@ -0,0 +1,195 @@
+import asyncio, random, time
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from core.logs import log
+from core.recheme import RechemeAPI
+from core.blrec import BLRECAPI
+from core.aggregator import RoomAggregator
+from core.roominfo import room_view
+from core.shaping import TokenBucket, request_budget
+
+logger = log()
+
+def _signature(view: Dict) -> Tuple:
+    """直播间状态特征，码率波动不算作变化"""
+    return (view["live"], view["recording"], view["title"], view["name"], view["autoRecord"])
+
+class PollTarget:
+    """一个轮询对象，录播机的直播间列表或单个直播间"""
+
+    def __init__(self, client: Union[RechemeAPI, BLRECAPI], room_id: Optional[int], min_interval: float, max_interval: float):
+        self.client = client
+        self.room_id = room_id
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.due = 0.0
+        self.signature = None
+        self.polls = 0
+        self.changes = 0
+        self.running = False
+
+    def schedule(self, changed: bool, backoff: float, jitter: float):
+        """有变化时缩短间隔，无变化时逐步延长，并加入随机抖动"""
+        if changed:
+            self.changes += 1
+            self.interval = max(self.min_interval, self.interval / 2)
+        else:
+            self.interval = min(self.max_interval, self.interval * backoff)
+        self.due = time.monotonic() + self.interval * random.uniform(1 - jitter, 1 + jitter)
+
+class PollScheduler:
+    """
+    按直播间活跃程度调整轮询间隔的后台轮询
+    录播机的直播间列表按变化频率调整间隔；直播中/录制中的直播间额外单独轮询；
+    所有轮询发出的录播机请求(含重试、对冲)共用一个全局速率限制，在发送请求时计入
+    """
+
+    def __init__(self, aggregator: RoomAggregator, clients_for: Callable[[], List[Union[RechemeAPI, BLRECAPI]]], options: Dict = None):
+        """
+        :param aggregator: 直播间列表汇总
+        :param clients_for: 获取当前所有录播机 API 实例
+        :param options: POLLING 配置
+        """
+        options = options or {}
+        self.aggregator = aggregator
+        self.clients_for = clients_for
+        self.rate = options.get("RATE_LIMIT", 5)
+        self.recorder_interval = (options.get("RECORDER_MIN_INTERVAL", 5), options.get("RECORDER_MAX_INTERVAL", 120))
+        self.room_interval = (options.get("ROOM_MIN_INTERVAL", 2), options.get("ROOM_MAX_INTERVAL", 15))
+        self.backoff = options.get("BACKOFF", 1.5)
+        self.jitter = options.get("JITTER", 0.2)
+        self.bucket = TokenBucket(self.rate, max(int(self.rate), 1)) if self.rate and self.rate > 0 else None
+        ## 同时进行的轮询数量上限，避免等待请求配额的轮询占满线程池
+        self.max_running = max(int(self.rate), 1) * 2 if self.bucket is not None else None
+        self.polls = 0
+        self._targets: Dict[Tuple, PollTarget] = {}
+        self._clients_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._running = set()
+
+    @staticmethod
+    def _client_key(client: Union[RechemeAPI, BLRECAPI]) -> Tuple[str, str, str]:
+        return (client.rec_type, client.name, client.host)
+
+    def _sync_clients(self):
+        """录播机配置变化时更新轮询对象"""
+        clients = {self._client_key(client): client for client in self.clients_for()}
+        for key in [key for key in self._targets if key[:3] not in clients]:
+            del self._targets[key]
+        for key, client in clients.items():
+            target = self._targets.get(key + (None,))
+            if target is None:
+                self._targets[key + (None,)] = PollTarget(client, None, *self.recorder_interval)
+            else:
+                target.client = client
+        self._clients_at = time.monotonic()
+
+    def _sync_rooms(self, client: Union[RechemeAPI, BLRECAPI], views: List[Dict]):
+        """直播中/录制中的直播间加入单独轮询，其余由直播间列表轮询覆盖"""
+        client_key = self._client_key(client)
+        active = {view["roomId"] for view in views if view["live"] or view["recording"]}
+        for key in [key for key in self._targets if key[:3] == client_key and key[3] is not None and key[3] not in active]:
+            del self._targets[key]
+        for room_id in active:
+            if client_key + (room_id,) not in self._targets:
+                target = PollTarget(client, room_id, *self.room_interval)
+                target.due = time.monotonic() + target.interval * random.uniform(0, 1)
+                self._targets[client_key + (room_id,)] = target
+
+    async def _poll(self, key: Tuple, target: PollTarget):
+        request_budget.set(self.bucket)
+        target.polls += 1
+        try:
+            if target.room_id is None:
+                snapshot = await self.aggregator.refresh(target.client)
+                if snapshot is None or snapshot.stale:
+                    target.schedule(False, self.backoff, self.jitter)
+                    return
+                views = [view for view in map(room_view, snapshot.rooms) if view is not None]
+                signature = tuple(sorted((view["roomId"],) + _signature(view) for view in views))
+                self._sync_rooms(target.client, views)
+            else:
+                room = await asyncio.to_thread(target.client.get_room, str(target.room_id))
+                view = room_view(room) if room else None
+                if view is None:
+                    target.schedule(False, self.backoff, self.jitter)
+                    return
+                self.aggregator.update_room(target.client, room)
+                signature = _signature(view)
+                if not (view["live"] or view["recording"]):
+                    self._targets.pop(key, None)
+            changed = target.signature is not None and signature != target.signature
+            target.signature = signature
+            target.schedule(changed, self.backoff, self.jitter)
+        except Exception as e:
+            logger.error(f"[轮询] {target.client.name} 轮询失败: {e}")
+            target.schedule(False, self.backoff, self.jitter)
+        finally:
+            target.running = False
+
+    async def _run(self):
+        logger.info(f"[轮询] 后台轮询已启动，全局速率上限 {self.rate or '不限'}/s")
+        while True:
+            if time.monotonic() - self._clients_at > 10:
+                self._sync_clients()
+
+            now = time.monotonic()
+            due = sorted(
+                ((key, target) for key, target in self._targets.items() if not target.running and target.due <= now),
+                key=lambda item: item[1].due
+            )
+            if not due:
+                await asyncio.sleep(0.5)
+                continue
+
+            for key, target in due:
+                if key not in self._targets:
+                    continue
+                while self.max_running is not None and len(self._running) >= self.max_running:
+                    await asyncio.sleep(0.1)
+                target.running = True
+                self.polls += 1
+                task = asyncio.create_task(self._poll(key, target))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+    def start(self):
+        """启动后台轮询"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台轮询"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        """获取各轮询对象的当前间隔"""
+        now = time.monotonic()
+        recorders, rooms = [], []
+        for (rec_type, rec_name, host, room_id), target in list(self._targets.items()):
+            item = {
+                "recType": rec_type,
+                "recName": rec_name,
+                "recHost": host,
+                "interval": round(target.interval, 2),
+                "nextPoll": round(max(target.due - now, 0), 2),
+                "polls": target.polls,
+                "changes": target.changes
+            }
+            if room_id is None:
+                recorders.append(item)
+            else:
+                rooms.append(dict(item, roomId=room_id))
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "rateLimit": self.rate,
+            "polls": self.polls,
+            "recorders": recorders,
+            "rooms": rooms
+        }
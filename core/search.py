@@ -0,0 +1,244 @@
+import re, threading, unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+from core.logs import log
+from core.state import RoomStateStore
+
+logger = log()
+
+## 中日韩文字按 2-gram 索引，其余按单词索引
+CJK_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]+")
+WORD_PATTERN = re.compile(r"[0-9a-z]+")
+
+## 字段权重，名称与房间号匹配排在标题与分区之前
+FIELD_WEIGHTS = {"roomId": 8, "name": 6, "title": 3, "area": 2}
+
+## 单词前缀最多索引的长度
+MAX_PREFIX = 16
+
+def normalize(text: str) -> str:
+    """统一全角/半角与大小写"""
+    return unicodedata.normalize("NFKC", text or "").casefold()
+
+def tokenize(text: str) -> List[Tuple[str, bool]]:
+    """
+    切分文本
+    :return: [(词, 是否为中日韩文字)]，中日韩文字按连续片段返回
+    """
+    text = normalize(text)
+    tokens = []
+    position = 0
+    for match in CJK_PATTERN.finditer(text):
+        tokens.extend((word, False) for word in WORD_PATTERN.findall(text[position:match.start()]))
+        tokens.append((match.group(), True))
+        position = match.end()
+    tokens.extend((word, False) for word in WORD_PATTERN.findall(text[position:]))
+    return tokens
+
+def _index_terms(text: str) -> Tuple[Set[str], Set[str]]:
+    """
+    生成文本的索引词
+    :return: (完整词, 部分词)，单词的前缀与中日韩文字的单字作为部分词
+    """
+    terms, partials = set(), set()
+    for token, cjk in tokenize(text):
+        if cjk:
+            partials.update(token)
+            if len(token) == 1:
+                terms.add(token)
+            terms.update(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            terms.add(token)
+            partials.update(token[:i] for i in range(1, min(len(token), MAX_PREFIX + 1)))
+    return terms, partials
+
+def _query_units(query: str) -> List[List[Tuple[str, bool]]]:
+    """
+    将查询拆分为匹配单元，每个单元的所有词都需要匹配
+    :return: [[(词, 是否要求完整匹配)]]
+    """
+    units = []
+    for token, cjk in tokenize(query):
+        if cjk and len(token) == 1:
+            units.append([(token, False)])
+        elif cjk:
+            units.append([(token[i:i + 2], True) for i in range(len(token) - 1)])
+        else:
+            units.append([(token, False)])
+    return units
+
+class RoomSearchIndex:
+    """
+    直播间搜索索引，按房间号索引名称、标题、分区与房间号
+    从 RoomStateStore 的直播间变化记录增量更新，变化记录不完整时重建
+    """
+
+    def __init__(self, state_store: RoomStateStore):
+        """
+        :param state_store: 直播间状态汇总
+        """
+        self.state_store = state_store
+        self.version = 0
+        ## 房间号 -> {"fields": 索引字段, "owners": {(录播类型, 录播机名称, 地址): 直播间状态}}
+        self._docs: Dict[int, Dict] = {}
+        ## 词 -> {房间号: 权重}
+        self._terms: Dict[str, Dict[int, int]] = {}
+        self._partials: Dict[str, Dict[int, int]] = {}
+        ## 房间号 -> (完整词权重, 部分词权重)，更新时用于移除旧的索引词
+        self._doc_terms: Dict[int, Tuple[Dict[str, int], Dict[str, int]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fields(view: Dict) -> Dict[str, str]:
+        return {"roomId": str(view["roomId"]), "name": view["name"], "title": view["title"], "area": view["area"]}
+
+    def _unindex(self, room_id: int):
+        terms, partials = self._doc_terms.pop(room_id, ({}, {}))
+        for postings, words in [(self._terms, terms), (self._partials, partials)]:
+            for word in words:
+                docs = postings.get(word)
+                if docs is None:
+                    continue
+                docs.pop(room_id, None)
+                if not docs:
+                    del postings[word]
+
+    def _index(self, room_id: int, fields: Dict[str, str]):
+        terms, partials = {}, {}
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            field_terms, field_partials = _index_terms(text)
+            for word in field_terms:
+                terms[word] = max(terms.get(word, 0), weight)
+            for word in field_partials:
+                partials[word] = max(partials.get(word, 0), weight)
+        for postings, words in [(self._terms, terms), (self._partials, partials)]:
+            for word, weight in words.items():
+                postings.setdefault(word, {})[room_id] = weight
+        self._doc_terms[room_id] = (terms, partials)
+
+    def _apply(self, key: Tuple[str, str, str], room_id: int, view: Optional[Dict]):
+        """应用单个直播间的变化，索引字段没有变化时只更新状态"""
+        doc = self._docs.get(room_id)
+        if view is None:
+            if doc is None:
+                return
+            doc["owners"].pop(key, None)
+            if not doc["owners"]:
+                del self._docs[room_id]
+                self._unindex(room_id)
+            return
+
+        fields = self._fields(view)
+        if doc is None:
+            doc = self._docs[room_id] = {"fields": None, "owners": {}}
+        doc["owners"][key] = view
+        if doc["fields"] != fields:
+            self._unindex(room_id)
+            self._index(room_id, fields)
+            doc["fields"] = fields
+
+    def _rebuild(self):
+        version, rooms = self.state_store.snapshot()
+        self._docs, self._terms, self._partials, self._doc_terms = {}, {}, {}, {}
+        for key, views in rooms.items():
+            for room_id, view in views.items():
+                self._apply(key, room_id, view)
+        self.version = version
+        logger.debug(f"[搜索] 已重建索引，共 {len(self._docs)} 个直播间，{len(self._terms) + len(self._partials)} 个索引词")
+
+    def sync(self):
+        """应用上次同步之后的直播间变化"""
+        with self._lock:
+            while self.version < self.state_store.version:
+                changes = self.state_store.changes(self.version, 1000)
+                if changes["reset"]:
+                    self._rebuild()
+                    return
+                if changes["version"] <= self.version:
+                    break
+                for change in changes["data"]:
+                    key = (change["recType"], change["recName"], change["recHost"])
+                    self._apply(key, change["roomId"], change["room"])
+                self.version = changes["version"]
+
+    def _match(self, units: List[List[Tuple[str, bool]]]) -> Dict[int, int]:
+        """返回全部单元都匹配的房间号与得分，完整词匹配的得分是部分词的两倍"""
+        scores: Optional[Dict[int, int]] = None
+        for unit in units:
+            unit_scores: Optional[Dict[int, int]] = None
+            for word, exact in unit:
+                word_scores = {room_id: weight * 2 for room_id, weight in self._terms.get(word, {}).items()}
+                if not exact:
+                    for room_id, weight in self._partials.get(word[:MAX_PREFIX], {}).items():
+                        # 前缀只索引到 MAX_PREFIX，更长的词需要检查完整的单词
+                        if len(word) > MAX_PREFIX and not any(term.startswith(word) for term in self._doc_terms[room_id][0]):
+                            continue
+                        word_scores[room_id] = max(word_scores.get(room_id, 0), weight)
+                if unit_scores is None:
+                    unit_scores = word_scores
+                else:
+                    unit_scores = {room_id: score + word_scores[room_id] for room_id, score in unit_scores.items() if room_id in word_scores}
+                if not unit_scores:
+                    return {}
+            if scores is None:
+                scores = unit_scores
+            else:
+                scores = {room_id: score + unit_scores[room_id] for room_id, score in scores.items() if room_id in unit_scores}
+            if not scores:
+                return {}
+        return scores or {}
+
+    def search(self, query: str, limit: int = 20, recType: str = None) -> Dict:
+        """
+        搜索直播间
+        :param query: 查询文本，单词按前缀匹配，中日韩文字按 2-gram 匹配
+        :param limit: 返回数量
+        :param recType: 录播类型，不指定时搜索全部
+        :return: 按得分从高到低排序，得分相同时直播中/录制中的直播间优先
+        """
+        self.sync()
+        units = _query_units(query)
+        if not units:
+            return {"total": 0, "data": []}
+
+        normalized = normalize(query).strip()
+        with self._lock:
+            scores = self._match(units)
+            results = []
+            for room_id, score in scores.items():
+                doc = self._docs[room_id]
+                owners = [key for key in doc["owners"] if not recType or key[0] == recType]
+                if not owners:
+                    continue
+                name = normalize(doc["fields"]["name"])
+                if name == normalized or doc["fields"]["roomId"] == normalized:
+                    score += 20
+                elif name.startswith(normalized):
+                    score += 10
+                views = [doc["owners"][key] for key in owners]
+                results.append({
+                    "roomId": room_id,
+                    "name": doc["fields"]["name"],
+                    "title": doc["fields"]["title"],
+                    "area": doc["fields"]["area"],
+                    "live": any(view["live"] for view in views),
+                    "recording": any(view["recording"] for view in views),
+                    "score": score,
+                    "recorders": [
+                        {"recType": rec_type, "recName": rec_name}
+                        for rec_type, rec_name in dict.fromkeys((key[0], key[1]) for key in owners)
+                    ]
+                })
+
+        results.sort(key=lambda item: (-item["score"], not item["recording"], not item["live"], item["roomId"]))
+        return {"total": len(results), "data": results[:limit]}
+
+    def stats(self) -> Dict:
+        """获取索引规模"""
+        with self._lock:
+            return {
+                "version": self.version,
+                "rooms": len(self._docs),
+                "terms": len(self._terms),
+                "partials": len(self._partials)
+            }
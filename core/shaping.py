@@ -0,0 +1,171 @@
+import time, threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+from core.logs import log
+
+logger = log()
+
+class UpstreamBusyError(Exception):
+    """等待录播机请求配额超时"""
+
+class TokenBucket:
+    """令牌桶限速"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        :param rate: 每秒请求数
+        :param burst: 允许的突发请求数
+        """
+        self.rate = rate
+        self.burst = max(int(burst), 1)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float = None) -> float:
+        """
+        预约一个令牌
+        :param max_wait: 最长等待时间(秒)，需要等待更久时不预约
+        :return: 需要等待的时间(秒)，超过 max_wait 时表示未预约
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            delay = max(1 - self._tokens, 0) / self.rate
+            if max_wait is not None and delay > max_wait:
+                return delay
+            self._tokens -= 1
+            return delay
+
+    def refund(self):
+        """归还已预约但未使用的令牌"""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+## 当前请求需要额外占用的全局请求配额，后台轮询时设置，重试、对冲等产生的每个请求都会占用
+request_budget: ContextVar[Optional[TokenBucket]] = ContextVar("request_budget", default=None)
+
+class UpstreamLimiter:
+    """单个录播机的并发与速率限制"""
+
+    def __init__(self, host: str, max_concurrency: int = 4, rate: float = 0, burst: int = 5, queue_timeout: float = 10):
+        """
+        :param host: 录播机地址
+        :param max_concurrency: 最大并发请求数，0 为不限制
+        :param rate: 每秒请求数，0 为不限制
+        :param burst: 允许的突发请求数
+        :param queue_timeout: 排队超时时间(秒)
+        """
+        self.host = host
+        self.options = None
+        self.requests = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self.configure(max_concurrency, rate, burst, queue_timeout)
+
+    def configure(self, max_concurrency: int = 4, rate: float = 0, burst: int = 5, queue_timeout: float = 10):
+        """更新限制参数，参数未变化时保持现有状态"""
+        options = (max_concurrency, rate, burst, queue_timeout)
+        if options == self.options:
+            return
+        self.options = options
+        self.max_concurrency = max(int(max_concurrency or 0), 0)
+        self.queue_timeout = queue_timeout
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency) if self.max_concurrency else None
+        self._bucket = TokenBucket(rate, burst) if rate and rate > 0 else None
+        logger.debug(f"[限流] {self.host} 并发上限: {self.max_concurrency or '不限'}，速率: {rate or '不限'}/s")
+
+    @contextmanager
+    def acquire(self):
+        """获取请求配额，排队等待直到可以发送"""
+        semaphore, bucket = self._semaphore, self._bucket
+        budget = request_budget.get()
+        if budget is not None:
+            delay = budget.reserve()
+            if delay > 0:
+                time.sleep(delay)
+        start = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+        try:
+            if bucket is not None:
+                delay = bucket.reserve(self.queue_timeout)
+                if delay > self.queue_timeout:
+                    raise UpstreamBusyError(f"{self.host} 请求速率超限")
+                if delay > 0:
+                    time.sleep(delay)
+            if semaphore is not None:
+                remaining = max(self.queue_timeout - (time.monotonic() - start), 0)
+                if not semaphore.acquire(timeout=remaining):
+                    if bucket is not None:
+                        bucket.refund()
+                    raise UpstreamBusyError(f"{self.host} 并发请求已满")
+        except UpstreamBusyError:
+            with self._lock:
+                self.waiting -= 1
+                self.rejected += 1
+            raise
+
+        queue_time = time.monotonic() - start
+        with self._lock:
+            self.waiting -= 1
+            self.in_flight += 1
+            self.requests += 1
+            self.queue_time_total += queue_time
+            self.queue_time_max = max(self.queue_time_max, queue_time)
+        try:
+            yield queue_time
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            if semaphore is not None:
+                semaphore.release()
+
+    def stats(self) -> Dict:
+        """获取排队统计"""
+        with self._lock:
+            return {
+                "host": self.host,
+                "maxConcurrency": self.max_concurrency,
+                "inFlight": self.in_flight,
+                "waiting": self.waiting,
+                "requests": self.requests,
+                "rejected": self.rejected,
+                "queueTimeAvg": round(self.queue_time_total / self.requests, 4) if self.requests else 0,
+                "queueTimeMax": round(self.queue_time_max, 4)
+            }
+
+_limiters: Dict[str, UpstreamLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(host: str, options: Optional[Dict] = None) -> UpstreamLimiter:
+    """
+    获取录播机的限流器，同一地址共用一个
+    :param options: MAX_CONCURRENCY / RATE_LIMIT / RATE_BURST / QUEUE_TIMEOUT 配置
+    """
+    options = options or {}
+    params = (
+        options.get("MAX_CONCURRENCY", 4),
+        options.get("RATE_LIMIT", 0),
+        options.get("RATE_BURST", 5),
+        options.get("QUEUE_TIMEOUT", 10)
+    )
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = _limiters[host] = UpstreamLimiter(host, *params)
+        else:
+            limiter.configure(*params)
+        return limiter
+
+def limiter_stats() -> Dict[str, Dict]:
+    """获取所有录播机的排队统计"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.host: limiter.stats() for limiter in limiters}
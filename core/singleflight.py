@@ -0,0 +1,62 @@
+import copy, threading
+from typing import Any, Callable, Dict, Hashable
+from core.logs import log
+
+logger = log()
+
+class _Call:
+    """进行中的请求"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """合并相同的并发请求，同一时刻相同 key 的请求只执行一次，结果由所有调用方共享"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        """
+        执行请求，若已有相同 key 的请求在进行中则等待其结果
+        :param key: 请求标识
+        :param func: 实际执行的函数
+        :return: 函数返回值，等待方获得的是结果的副本
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                waiters = call.waiters
+            if waiters:
+                call.result = copy.deepcopy(result)
+                logger.debug(f"[合并请求] {key} 合并了 {waiters} 个相同请求")
+            call.event.set()
+
+## 录播机请求共用
+upstream_flight = SingleFlight()
@@ -0,0 +1,267 @@
+import uuid, threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from core.logs import log
+from core.roominfo import room_view
+
+logger = log()
+
+RecorderKey = Tuple[str, str, str]
+
+## 其他 RecStutas 面板的直播间，只读，不参与重复检测
+REMOTE_TYPES = ["recstutas"]
+
+## 不记录为直播间变化的字段，码率与写入速率每次轮询都会波动
+VOLATILE_FIELDS = ["bitrate", "disk"]
+
+def _stable(view: Optional[Dict]) -> Optional[Dict]:
+    if view is None:
+        return None
+    return {field: value for field, value in view.items() if field not in VOLATILE_FIELDS}
+
+class RoomStateStore:
+    """直播间状态汇总，按直播间变化增量维护统计数据"""
+
+    def __init__(self, changes_size: int = 1000):
+        """
+        :param changes_size: 保留的直播间变化记录数量
+        """
+        self._rooms: Dict[RecorderKey, Dict[int, Dict]] = {}
+        ## (录播类型, 录播机名称) -> 统计
+        self._recorders: Dict[Tuple[str, str], Dict] = {}
+        self._totals = self._empty_counter()
+        ## 房间号 -> {(录播类型, 录播机名称): 地址数量}，用于发现重复录制，不包含其他面板的直播间
+        self._owners: Dict[int, Dict[Tuple[str, str], int]] = {}
+        ## 直播间变化记录，按版本号递增
+        self._changes = deque(maxlen=changes_size)
+        self.version = 0
+        ## 每次启动生成，版本号从 0 重新计数，用于让同步方发现面板已重启
+        self.epoch = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.updated_at = None
+
+    @staticmethod
+    def _empty_counter() -> Dict:
+        return {"rooms": 0, "live": 0, "recording": 0, "bitrate": 0.0, "disk": 0.0}
+
+    def _apply(self, recorder: Tuple[str, str], view: Dict, sign: int):
+        """将单个直播间计入或移出统计"""
+        counters = [self._totals, self._recorders.setdefault(recorder, self._empty_counter())]
+        for counter in counters:
+            counter["rooms"] += sign
+            counter["live"] += sign if view["live"] else 0
+            counter["recording"] += sign if view["recording"] else 0
+            counter["bitrate"] += sign * view["bitrate"]
+            counter["disk"] += sign * view["disk"]
+            if counter["rooms"] == 0:
+                counter["bitrate"] = 0.0
+                counter["disk"] = 0.0
+
+    def _index(self, key: RecorderKey, room_id: int, delta: int):
+        """维护房间号到录播机的索引"""
+        if key[0] in REMOTE_TYPES:
+            return
+        owners = self._owners.setdefault(room_id, {})
+        recorder = (key[0], key[1])
+        owners[recorder] = owners.get(recorder, 0) + delta
+        if owners[recorder] <= 0:
+            del owners[recorder]
+        if not owners:
+            del self._owners[room_id]
+
+    def _replace(self, key: RecorderKey, room_id: int, view: Optional[Dict]):
+        rooms = self._rooms.setdefault(key, {})
+        old = rooms.pop(room_id, None)
+        if _stable(old) != _stable(view):
+            self.version += 1
+            self._changes.append({
+                "version": self.version,
+                "time": datetime.now().isoformat(timespec="milliseconds"),
+                "type": "remove" if view is None else "update",
+                "recType": key[0],
+                "recName": key[1],
+                "recHost": key[2],
+                "roomId": room_id,
+                "room": view
+            })
+        if old is not None:
+            self._apply(key[:2], old, -1)
+            self._index(key, room_id, -1)
+        if view is not None:
+            rooms[room_id] = view
+            self._apply(key[:2], view, 1)
+            self._index(key, room_id, 1)
+
+    def _touch(self):
+        self.loaded = True
+        self.updated_at = datetime.now()
+
+    def update_recorder(self, rec_type: str, rec_name: str, rec_host: str, rooms: List[Dict]):
+        """
+        使用录播机的完整直播间列表更新状态
+        :param rooms: 录播机返回的直播间列表
+        """
+        key = (rec_type, rec_name, rec_host)
+        views = {}
+        for room in rooms:
+            view = room_view(room)
+            if view is not None:
+                views[view["roomId"]] = view
+
+        with self._lock:
+            current = self._rooms.get(key, {})
+            for room_id in [room_id for room_id in current if room_id not in views]:
+                self._replace(key, room_id, None)
+            for room_id, view in views.items():
+                if current.get(room_id) != view:
+                    self._replace(key, room_id, view)
+            self._touch()
+
+    def update_room(self, rec_type: str, rec_name: str, rec_host: str, room: Dict):
+        """更新单个直播间状态"""
+        view = room_view(room)
+        if view is None:
+            return
+        with self._lock:
+            self._replace((rec_type, rec_name, rec_host), view["roomId"], view)
+            self._touch()
+
+    def remove_room(self, rec_type: str, rec_name: str, rec_host: str, room_id: int):
+        """移除单个直播间"""
+        with self._lock:
+            self._replace((rec_type, rec_name, rec_host), int(room_id), None)
+            self._touch()
+
+    def remove_recorder(self, rec_type: str, rec_name: str):
+        """移除录播机的全部直播间"""
+        with self._lock:
+            for key in [key for key in self._rooms if key[0] == rec_type and key[1] == rec_name]:
+                for room_id in list(self._rooms[key]):
+                    self._replace(key, room_id, None)
+                del self._rooms[key]
+            if self._recorders.get((rec_type, rec_name), {}).get("rooms") == 0:
+                del self._recorders[(rec_type, rec_name)]
+            self._touch()
+
+    def recorder_load(self, rec_type: str, rec_name: str) -> Dict:
+        """获取单个录播机的统计"""
+        with self._lock:
+            return dict(self._recorders.get((rec_type, rec_name)) or self._empty_counter())
+
+    def recorder_rooms(self, rec_type: str, rec_name: str) -> List[Dict]:
+        """获取单个录播机的直播间"""
+        rooms = {}
+        with self._lock:
+            for key, views in self._rooms.items():
+                if key[0] == rec_type and key[1] == rec_name:
+                    rooms.update(views)
+        return list(rooms.values())
+
+    def snapshot(self) -> Tuple[int, Dict[RecorderKey, Dict[int, Dict]]]:
+        """
+        获取全部直播间状态
+        :return: (版本号, {(录播类型, 录播机名称, 地址): {房间号: 直播间状态}})
+        """
+        with self._lock:
+            return self.version, {key: dict(rooms) for key, rooms in self._rooms.items()}
+
+    def changes(self, since: int = 0, limit: int = 500) -> Dict:
+        """
+        获取指定版本之后的直播间变化
+        :param since: 上次获取到的版本号
+        :return: reset 为 true 时表示变化记录已不完整或版本号超前(面板已重启)，需要重新获取完整列表
+        """
+        with self._lock:
+            changes = [change for change in self._changes if change["version"] > since]
+            oldest = self._changes[0]["version"] if self._changes else self.version + 1
+            version = self.version
+        return {
+            "version": changes[limit - 1]["version"] if len(changes) > limit else version,
+            "epoch": self.epoch,
+            "reset": since < oldest - 1 or since > version,
+            "data": changes[:limit]
+        }
+
+    def lookup(self, room_ids: List[int]) -> Dict[int, List[Dict]]:
+        """
+        按房间号查询所在的录播机，同一录播机的多个地址只返回一份
+        :param room_ids: 房间号列表
+        :return: 房间号 -> [{recType, recName, recHost, view}]，不存在的房间号为空列表
+        """
+        result = {room_id: [] for room_id in room_ids}
+        with self._lock:
+            remote = [(key, rooms) for key, rooms in self._rooms.items() if key[0] in REMOTE_TYPES]
+            for room_id in result:
+                owners = list(self._owners.get(room_id, {}))
+                owners += [key[:2] for key, rooms in remote if room_id in rooms]
+                for rec_type, rec_name in dict.fromkeys(owners):
+                    for key, rooms in self._rooms.items():
+                        if key[0] == rec_type and key[1] == rec_name and room_id in rooms:
+                            result[room_id].append({
+                                "recType": rec_type,
+                                "recName": rec_name,
+                                "recHost": key[2],
+                                "view": rooms[room_id]
+                            })
+                            break
+        return result
+
+    def duplicates(self) -> Dict:
+        """
+        获取在多个录播机中重复添加的直播间
+        重复录制浪费的码率按除码率最高的一份以外的其余副本计算
+        """
+        with self._lock:
+            owners = {room_id: list(recorders) for room_id, recorders in self._owners.items() if len(recorders) > 1}
+            views = {}
+            for key, rooms in self._rooms.items():
+                for room_id in owners:
+                    if room_id in rooms:
+                        views[(room_id, key[0], key[1])] = rooms[room_id]
+
+        data = []
+        wasted_total = 0.0
+        for room_id, recorders in sorted(owners.items()):
+            copies = [
+                {
+                    "recType": rec_type,
+                    "recName": rec_name,
+                    "live": views[(room_id, rec_type, rec_name)]["live"],
+                    "recording": views[(room_id, rec_type, rec_name)]["recording"],
+                    "bitrate": views[(room_id, rec_type, rec_name)]["bitrate"]
+                }
+                for rec_type, rec_name in recorders
+            ]
+            wasted = sum(item["bitrate"] for item in copies) - max(item["bitrate"] for item in copies)
+            wasted_total += wasted
+            data.append({
+                "roomId": room_id,
+                "recording": sum(1 for item in copies if item["recording"]),
+                "wastedBitrate": round(wasted, 3),
+                "recorders": copies
+            })
+        return {"total": len(data), "wastedBitrate": round(wasted_total, 3), "data": data}
+
+    def summary(self) -> Dict:
+        """获取汇总统计"""
+        with self._lock:
+            totals = dict(self._totals)
+            recorders = {}
+            for (rec_type, rec_name), counter in self._recorders.items():
+                recorders.setdefault(rec_type, {})[rec_name] = dict(counter)
+            updated_at = self.updated_at
+
+        for counter in [totals, *(counter for names in recorders.values() for counter in names.values())]:
+            counter["bitrate"] = round(counter["bitrate"], 3)
+            counter["disk"] = round(counter["disk"], 3)
+        return {
+            "totalRooms": totals["rooms"],
+            "liveRooms": totals["live"],
+            "recordingRooms": totals["recording"],
+            "totalBitrate": totals["bitrate"],
+            "totalDiskRate": totals["disk"],
+            "recorders": recorders,
+            "updatedAt": updated_at.isoformat(timespec="seconds") if updated_at else None
+        }
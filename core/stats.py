@@ -0,0 +1,61 @@
+import asyncio
+from typing import Dict, List, Union
+from core.cache import TTLCache
+from core.logs import log
+from core.recheme import RechemeAPI
+from core.blrec import BLRECAPI
+
+logger = log()
+
+class RoomStatsCollector:
+    """批量获取直播间统计信息"""
+
+    def __init__(self, ttl: float = 5, concurrency: int = 8):
+        """
+        初始化统计采集器
+        :param ttl: 统计结果缓存时间(秒)
+        :param concurrency: 每个录播机的最大并发请求数
+        """
+        self.cache = TTLCache(ttl)
+        self.concurrency = max(int(concurrency), 1)
+
+    async def collect(self, client: Union[RechemeAPI, BLRECAPI], room_ids: List[int]) -> List[Dict]:
+        """
+        获取单个录播机中多个直播间的 stats / iostats
+        :param client: 录播机 API 实例
+        :param room_ids: 房间号列表
+        :return: 统计信息列表
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        rec_server = {
+            "recName": client.name,
+            "recType": client.rec_type,
+            "recHost": client.host,
+            "recManage": client.manage
+        }
+
+        async def fetch(room_id: int) -> Dict:
+            key = (client.rec_type, client.name, client.host, room_id)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+            async with semaphore:
+                stats = await asyncio.to_thread(client.get_room_stats, room_id)
+                iostats = None
+                if hasattr(client, "get_room_iostats"):
+                    iostats = await asyncio.to_thread(client.get_room_iostats, room_id)
+
+            result = {
+                "roomId": room_id,
+                "stats": stats,
+                "iostats": iostats,
+                "recServer": rec_server
+            }
+            if stats is not None or iostats is not None:
+                self.cache.set(key, result)
+            return result
+
+        results = await asyncio.gather(*(fetch(room_id) for room_id in room_ids))
+        logger.debug(f"[统计] {client.name} 获取 {len(results)} 个直播间统计信息")
+        return list(results)
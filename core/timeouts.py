@@ -0,0 +1,150 @@
+import re, time, threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+from core.logs import log
+
+logger = log()
+
+def endpoint_pattern(endpoint: str) -> str:
+    """将端点中的房间号替换为占位符，room/123/stats -> room/{id}/stats"""
+    return re.sub(r"(^|/)\d+(?=/|$)", r"\1{id}", endpoint)
+
+class TimeoutPolicy:
+    """单个录播机的请求超时，可根据各端点最近的延迟自动调整"""
+
+    def __init__(self, host: str, connect: float = 3, read: float = 3, adaptive: bool = False,
+                 percentile: float = 99, multiplier: float = 3, min_timeout: float = 1,
+                 max_timeout: float = 30, window: int = 100, min_samples: int = 10, max_failures: int = 3):
+        """
+        :param host: 录播机地址
+        :param connect: 连接超时(秒)
+        :param read: 读取超时(秒)，自动调整时作为样本不足时的默认值
+        :param adaptive: 是否根据延迟自动调整读取超时
+        :param percentile: 计算超时使用的延迟百分位
+        :param multiplier: 超时 = 延迟百分位 * multiplier
+        :param min_timeout: 自动调整的最小读取超时(秒)
+        :param max_timeout: 自动调整的最大读取超时(秒)
+        :param window: 每个端点保留的延迟样本数
+        :param min_samples: 开始自动调整所需的最少样本数
+        :param max_failures: 连续失败达到该次数后，读取超时不超过默认值，直到请求再次成功
+        """
+        self.host = host
+        self.connect = connect
+        self.read = read
+        self.adaptive = adaptive
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.window = window
+        self.min_samples = min_samples
+        self.max_failures = max_failures
+        ## 连续超时/连接失败的次数，请求成功后清零
+        self.failures = 0
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, **options):
+        """更新超时参数，保留已有的延迟样本"""
+        for key, value in options.items():
+            setattr(self, key, value)
+
+    def latency(self, endpoint: str, percentile: float = None) -> Optional[float]:
+        """获取端点的延迟百分位，样本不足时返回 None"""
+        with self._lock:
+            samples = sorted(self._samples.get(endpoint_pattern(endpoint), ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(int(len(samples) * (percentile or self.percentile) / 100), len(samples) - 1)
+        return samples[index]
+
+    def timeout(self, endpoint: str) -> Tuple[float, float]:
+        """
+        获取端点的超时时间
+        :return: (连接超时, 读取超时)
+        """
+        if not self.adaptive:
+            return self.connect, self.read
+        latency = self.latency(endpoint)
+        if latency is None:
+            return self.connect, self.read
+        read = min(max(latency * self.multiplier, self.min_timeout), self.max_timeout)
+        if self.failures >= self.max_failures:
+            # 录播机持续无响应时不再等待放宽后的超时，尽快失败
+            read = min(read, self.read)
+        return self.connect, round(read, 3)
+
+    def _record(self, endpoint: str, latency: float):
+        with self._lock:
+            samples = self._samples.get(endpoint_pattern(endpoint))
+            if samples is None:
+                samples = self._samples[endpoint_pattern(endpoint)] = deque(maxlen=self.window)
+            samples.append(latency)
+
+    @contextmanager
+    def measure(self, endpoint: str):
+        """
+        记录一次请求的延迟，超时与连接失败不计入样本，只累计连续失败次数
+        :return: 本次请求使用的 (连接超时, 读取超时)
+        """
+        timeout = self.timeout(endpoint)
+        start = time.monotonic()
+        try:
+            yield timeout
+        except Exception:
+            with self._lock:
+                self.failures += 1
+                if self.failures == self.max_failures:
+                    logger.warning(f"[超时] {self.host} 连续 {self.failures} 次请求失败，读取超时不再超过 {self.read} 秒")
+            raise
+        with self._lock:
+            self.failures = 0
+        self._record(endpoint, time.monotonic() - start)
+
+    def stats(self) -> Dict:
+        """获取各端点的延迟与当前超时"""
+        with self._lock:
+            endpoints = list(self._samples)
+        stats = {}
+        for endpoint in endpoints:
+            p50, p99 = self.latency(endpoint, 50), self.latency(endpoint, 99)
+            stats[endpoint] = {
+                "p50": round(p50, 4) if p50 is not None else None,
+                "p99": round(p99, 4) if p99 is not None else None,
+                "timeout": self.timeout(endpoint)[1]
+            }
+        return stats
+
+_policies: Dict[str, TimeoutPolicy] = {}
+_policies_lock = threading.Lock()
+
+def get_timeout_policy(host: str, options: Optional[Dict] = None) -> TimeoutPolicy:
+    """
+    获取录播机的超时策略，同一地址共用一个
+    :param options: CONNECT_TIMEOUT / READ_TIMEOUT / ADAPTIVE_TIMEOUT / TIMEOUT_PERCENTILE /
+                    TIMEOUT_MULTIPLIER / MIN_TIMEOUT / MAX_TIMEOUT 配置
+    """
+    options = options or {}
+    params = {
+        "connect": options.get("CONNECT_TIMEOUT", 3),
+        "read": options.get("READ_TIMEOUT", 3),
+        "adaptive": options.get("ADAPTIVE_TIMEOUT", False),
+        "percentile": options.get("TIMEOUT_PERCENTILE", 99),
+        "multiplier": options.get("TIMEOUT_MULTIPLIER", 3),
+        "min_timeout": options.get("MIN_TIMEOUT", 1),
+        "max_timeout": options.get("MAX_TIMEOUT", 30)
+    }
+    with _policies_lock:
+        policy = _policies.get(host)
+        if policy is None:
+            policy = _policies[host] = TimeoutPolicy(host, **params)
+        else:
+            policy.configure(**params)
+        return policy
+
+def timeout_stats() -> Dict[str, Dict]:
+    """获取所有录播机的延迟与超时"""
+    with _policies_lock:
+        policies = list(_policies.values())
+    return {policy.host: policy.stats() for policy in policies}
@@ -0,0 +1,98 @@
+import csv, io, json
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+## 导出字段
+EXPORT_FIELDS = ["roomId", "recName", "recType", "autoRecord"]
+## CSV 没有表头时的字段顺序
+IMPORT_FIELDS = ["roomId", "recName", "autoRecord", "recType"]
+
+def parse_bool(value, default: bool = True) -> bool:
+    """解析布尔值"""
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ["1", "true", "yes", "y", "on"]
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    将字节流逐行解码，只缓存未结束的一行
+    :param chunks: 字节流
+    """
+    buffer = b""
+    first = True
+    async for chunk in chunks:
+        buffer += chunk
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            text = line.decode("utf-8").rstrip("\r")
+            if first:
+                text = text.lstrip("\ufeff")
+                first = False
+            yield text
+    if buffer:
+        text = buffer.decode("utf-8").rstrip("\r")
+        yield text.lstrip("\ufeff") if first else text
+
+def _normalize_row(row: Dict) -> Dict:
+    room_id = row.get("roomId")
+    if room_id is None or str(room_id).strip() == "":
+        raise ValueError("缺少 roomId")
+    try:
+        room_id = int(str(room_id).strip())
+    except ValueError:
+        raise ValueError(f"roomId 格式错误: {room_id}")
+    return {
+        "roomId": room_id,
+        "recName": (str(row.get("recName") or "").strip()) or None,
+        "recType": (str(row.get("recType") or "").strip()) or None,
+        "autoRecord": parse_bool(row.get("autoRecord"))
+    }
+
+async def iter_import_rows(chunks: AsyncIterator[bytes], fmt: str = None) -> AsyncIterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """
+    逐行解析 CSV / NDJSON 格式的直播间分配
+    :param chunks: 字节流
+    :param fmt: csv 或 ndjson，不指定时根据首行内容判断
+    :return: (行号, 直播间分配, 错误信息)
+    """
+    header = None
+    line_no = 0
+    async for line in iter_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        if fmt is None:
+            fmt = "ndjson" if line.lstrip().startswith("{") else "csv"
+
+        try:
+            if fmt == "ndjson":
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError("每行必须是一个 JSON 对象")
+            else:
+                values = next(csv.reader([line]))
+                if header is None:
+                    if any(value.strip() == "roomId" for value in values):
+                        header = [value.strip() for value in values]
+                        continue
+                    header = IMPORT_FIELDS
+                row = dict(zip(header, values))
+            yield line_no, _normalize_row(row), None
+        except (ValueError, TypeError) as e:
+            yield line_no, None, str(e)
+
+def export_header(fmt: str) -> str:
+    """导出文件的表头"""
+    return ",".join(EXPORT_FIELDS) + "\n" if fmt == "csv" else ""
+
+def export_line(fmt: str, row: Dict) -> str:
+    """导出单个直播间分配"""
+    if fmt == "csv":
+        output = io.StringIO()
+        csv.writer(output, lineterminator="\n").writerow(
+            [str(row[field]).lower() if isinstance(row[field], bool) else row[field] for field in EXPORT_FIELDS]
+        )
+        return output.getvalue()
+    return json.dumps({field: row[field] for field in EXPORT_FIELDS}, ensure_ascii=False) + "\n"
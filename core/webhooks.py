@@ -0,0 +1,89 @@
+import copy
+from typing import Dict, Optional
+
+## 录播姬 Webhook v2 事件类型
+RECHEME_EVENTS = ["SessionStarted", "SessionEnded", "FileOpening", "FileClosed", "StreamStarted", "StreamEnded"]
+
+## BLREC Webhook 事件类型 -> 状态变化
+BLREC_EVENTS = {
+    "LiveBeganEvent": {"live": True},
+    "LiveEndedEvent": {"live": False},
+    "RoomChangeEvent": {},
+    "RecordingStartedEvent": {"recording": True},
+    "RecordingFinishedEvent": {"recording": False},
+    "RecordingCancelledEvent": {"recording": False}
+}
+
+def parse_recheme_event(payload: Dict) -> Optional[Dict]:
+    """
+    解析录播姬 Webhook v2 事件
+    :param payload: {"EventType": "SessionStarted", "EventData": {"RoomId": 1, "Recording": true, ...}}
+    :return: {"event": 事件类型, "roomId": 房间号, "fields": 状态变化}，无法识别时返回 None
+    """
+    event = payload.get("EventType")
+    data = payload.get("EventData") or {}
+    if event not in RECHEME_EVENTS or data.get("RoomId") is None:
+        return None
+
+    fields = {}
+    for key, field in [("Streaming", "live"), ("Recording", "recording"), ("Title", "title"), ("Name", "name")]:
+        if key in data:
+            fields[field] = data[key]
+    if event == "StreamStarted":
+        fields["live"] = True
+    elif event == "StreamEnded":
+        fields["live"] = False
+    elif event == "SessionStarted":
+        fields["recording"] = True
+    elif event == "SessionEnded":
+        fields["recording"] = False
+    return {"event": event, "roomId": int(data["RoomId"]), "fields": fields}
+
+def parse_blrec_event(payload: Dict) -> Optional[Dict]:
+    """
+    解析 BLREC Webhook 事件
+    :param payload: {"type": "LiveBeganEvent", "data": {"room_info": {"room_id": 1, ...}, "user_info": {...}}}
+    :return: {"event": 事件类型, "roomId": 房间号, "fields": 状态变化}，无法识别时返回 None
+    """
+    event = payload.get("type")
+    data = payload.get("data") or {}
+    room_info = data.get("room_info") or {}
+    room_id = room_info.get("room_id", data.get("room_id"))
+    if event not in BLREC_EVENTS or room_id is None:
+        return None
+
+    fields = {}
+    if "live_status" in room_info:
+        fields["live"] = room_info["live_status"] == 1
+    if "title" in room_info:
+        fields["title"] = room_info["title"]
+    if "name" in (data.get("user_info") or {}):
+        fields["name"] = data["user_info"]["name"]
+    fields.update(BLREC_EVENTS[event])
+    return {"event": event, "roomId": int(room_id), "fields": fields}
+
+def patch_room(room: Dict, fields: Dict) -> Dict:
+    """
+    将状态变化写入录播机返回的直播间数据
+    :param room: 录播姬或 BLREC 的直播间数据
+    :param fields: live / recording / title / name
+    :return: 修改后的副本
+    """
+    room = copy.deepcopy(room)
+    if "room_info" in room:
+        room_info = room.setdefault("room_info", {})
+        task_status = room.setdefault("task_status", {})
+        if "live" in fields:
+            room_info["live_status"] = 1 if fields["live"] else 0
+        if "recording" in fields:
+            task_status["running_status"] = "recording" if fields["recording"] else "waiting"
+        if "title" in fields:
+            room_info["title"] = fields["title"]
+        if "name" in fields:
+            room.setdefault("user_info", {})["name"] = fields["name"]
+        return room
+
+    for field, key in [("live", "streaming"), ("recording", "recording"), ("title", "title"), ("name", "name")]:
+        if field in fields:
+            room[key] = fields[field]
+    return room
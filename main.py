@@ -1,18 +1,39 @@
-import sys, requests, uvicorn, asyncio
+import os, sys, hmac, time, requests, uvicorn, asyncio
 from ruamel.yaml import YAML
 from typing import List, Dict, Union
 from fastapi import FastAPI, HTTPException, Depends, Form, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, StreamingResponse, JSONResponse
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, timedelta
 from contextlib import asynccontextmanager
 
-from core.logs import log, log_print
+from core.logs import log, log_print, configure_log, log_file_path
 from core.recheme import RechemeAPI
 from core.blrec import BLRECAPI
 from core.auth import Auth, get_current_user, requires_auth
+from core.stats import RoomStatsCollector
+from core.state import RoomStateStore
+from core.aggregator import RoomAggregator
+from core.placement import PlacementEngine, RecorderLoad
+from core.rebalance import Rebalancer, plan_moves
+from core.jobs import JobManager
+from core.transfer import iter_import_rows, export_header, export_line
+from core.roominfo import room_id_of, room_view
+from core.shaping import get_limiter, limiter_stats
+from core.retry import attempt_log, configure_retry, idempotency_key
+from core.timeouts import get_timeout_policy, timeout_stats
+from core.cache import room_config_cache
+from core.replicas import ReplicaClient, replica_stats
+from core.federation import FULL_SYNC_INTERVAL, RecStutasAPI
+from core.pool import close_sessions
+from core.webhooks import parse_recheme_event, parse_blrec_event
+from core.scheduler import PollScheduler
+from core.persist import SnapshotStore
+from core.logsearch import LogIndex, LogFilter, LEVELS
+from core.audit import audit_journal, audited
+from core.search import RoomSearchIndex
 
 # 变量
 ## 数据缓存
@@ -26,22 +47,143 @@ session.trust_env = False
 
 # 全局认证对象
 auth = None
+## 直播间统计采集
+stats_collector = None
+## 直播间状态汇总
+state_store = RoomStateStore()
+## 直播间搜索索引
+search_index = RoomSearchIndex(state_store)
+## 直播间列表汇总
+room_aggregator = None
+## 新建直播间分配
+placement_engine = None
+## 直播间迁移
+rebalancer = None
+## 后台任务
+background_tasks = set()
+## 批量操作任务队列
+job_manager = None
+## 后台轮询
+poll_scheduler = None
+## 本地快照
+snapshot_store = None
+## 日志查询
+log_index = None
+## 批量查询直播间的数量上限
+LOOKUP_LIMIT = 5000
+## 启动预热是否完成
+ready = False
 
 # run
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
-        global config, auth
+        global config, auth, stats_collector, room_aggregator, placement_engine, rebalancer, job_manager, poll_scheduler, snapshot_store, log_index
         config = load_config()
+        configure_log(config.get("LOG", {}) or {})
+        audit_journal.configure(config.get("AUDIT", {}) or {})
+        if log_file_path():
+            log_index = LogIndex(os.path.dirname(log_file_path()), os.path.basename(log_file_path()))
         auth = Auth(config)
+        stats_config = config.get("STATS", {}) or {}
+        stats_collector = RoomStatsCollector(
+            ttl=stats_config.get("CACHE_TTL", 5),
+            concurrency=stats_config.get("CONCURRENCY", 8)
+        )
+        rooms_config = config.get("ROOMS", {}) or {}
+        room_config_cache.ttl = rooms_config.get("CONFIG_CACHE_TTL", 600)
+        room_aggregator = RoomAggregator(
+            state_store,
+            refresh_interval=rooms_config.get("REFRESH_INTERVAL", 2)
+        )
+        placement_engine = PlacementEngine(config.get("PLACEMENT", {}) or {})
+        configure_retry(config.get("RETRY", {}) or {})
+        rebalance_config = config.get("REBALANCE", {}) or {}
+        rebalancer = Rebalancer(
+            rec_targets,
+            state_store,
+            concurrency=rebalance_config.get("CONCURRENCY", 2)
+        )
+        jobs_config = config.get("JOBS", {}) or {}
+        job_manager = JobManager(
+            concurrency=jobs_config.get("CONCURRENCY", 4),
+            keep=jobs_config.get("KEEP", 50)
+        )
         logger.debug("[启动] 配置加载成功")
     except Exception as e:
         logger.error(f"[启动] 配置加载失败: {e}")
         raise e
+
+    persist_config = config.get("PERSIST", {}) or {}
+    if persist_config.get("ENABLE", True):
+        snapshot_store = SnapshotStore(persist_config.get("PATH", "data/snapshot.db"))
+        try:
+            configured = {(client.rec_type, client.name, client.host) for client in rec_targets() + site_targets()}
+            room_aggregator.restore([
+                item for item in snapshot_store.load()
+                if (item["recType"], item["recName"], item["recHost"]) in configured
+            ])
+        except Exception as e:
+            logger.error(f"[快照] 加载本地快照失败: {e}")
+        task = asyncio.create_task(save_snapshots(persist_config.get("INTERVAL", 60)))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+    task = asyncio.create_task(warm_up())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+    polling_config = config.get("POLLING", {}) or {}
+    if polling_config.get("ENABLE", False):
+        poll_scheduler = PollScheduler(room_aggregator, rec_targets, polling_config)
+        poll_scheduler.start()
     
     yield
     
     logger.debug("[关闭] 应用正在关闭")
+    audit_journal.stop()
+    if poll_scheduler is not None:
+        await poll_scheduler.stop()
+    if snapshot_store is not None:
+        try:
+            snapshot_store.save(room_aggregator.export())
+        except Exception as e:
+            logger.error(f"[快照] 保存本地快照失败: {e}")
+    close_sessions()
+
+async def save_snapshots(interval: float):
+    """定期将直播间列表保存到本地快照，没有变化时跳过"""
+    saved_version = state_store.version
+    while True:
+        await asyncio.sleep(interval)
+        if state_store.version == saved_version:
+            continue
+        saved_version = state_store.version
+        try:
+            await asyncio.to_thread(snapshot_store.save, room_aggregator.export())
+        except Exception as e:
+            logger.error(f"[快照] 保存本地快照失败: {e}")
+
+async def warm_up(retry_interval: float = 5):
+    """
+    启动预热，并行建立各录播机的连接并获取第一次直播间列表
+    至少一个录播机获取到最新数据后才标记为就绪，本地快照中的旧数据不算，全部失败时定期重试
+    """
+    global ready
+    start = datetime.now()
+    while True:
+        try:
+            clients = rec_targets() + site_targets()
+            snapshots = await asyncio.gather(*(room_aggregator.refresh(client) for client in clients))
+            online = sum(1 for snapshot in snapshots if snapshot is not None and not snapshot.stale)
+            if online or not clients:
+                logger.info(f"[启动] 预热完成，{online}/{len(clients)} 个录播机在线，耗时 {(datetime.now() - start).total_seconds():.2f} 秒")
+                ready = True
+                return
+            logger.warning(f"[启动] 预热时所有录播机均无法访问，{retry_interval} 秒后重试")
+        except Exception as e:
+            logger.error(f"[启动] 预热失败: {e}，{retry_interval} 秒后重试")
+        await asyncio.sleep(retry_interval)
 
 app = FastAPI(lifespan=lifespan)
 
@@ -56,6 +198,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def bind_idempotency_key(request: Request, call_next):
+    """读取请求头 Idempotency-Key，用于创建/删除请求去重"""
+    token = idempotency_key.set(request.headers.get("Idempotency-Key"))
+    try:
+        return await call_next(request)
+    finally:
+        idempotency_key.reset(token)
+
 app.mount("/assets", StaticFiles(directory="web/assets"), name="assets")
 
 @app.get("/", response_class=HTMLResponse)
@@ -83,6 +234,7 @@ class RecServerInfo(BaseModel):
     recHost: str
     recStatus: str
     recManage: bool
+    recSite: str = None
 
 class RoomConfigRequest(BaseModel):
     danmaku: bool = True
@@ -132,6 +284,29 @@ class LoginRequest(BaseModel):
     username: str
     password: str
 
+class RebalanceRequest(BaseModel):
+    recType: str = None
+    maxMoves: int = 50
+    includeRecording: bool = False
+    dryRun: bool = True
+    rollback: bool = True
+
+class BulkControlRequest(BaseModel):
+    action: str
+    roomIds: List[int] = None
+    recType: str = None
+    recName: str = None
+    live: bool = None
+    recording: bool = None
+
+class LookupRoomsRequest(BaseModel):
+    roomIds: List[int]
+    recType: str = None
+
+class ResolveDuplicatesRequest(BaseModel):
+    roomIds: List[int] = None
+    dryRun: bool = True
+
 class DeleteServerRequest(BaseModel):
     recName: str
     recType: str
@@ -196,80 +371,57 @@ async def check_server_status(url: str) -> bool:
         return False
 
 async def get_all_recservers() -> List[RecServerInfo]:
-    servers = []
     """获取所有录播机信息"""
-    if "RECHEME" in config:
-        for rec_name, api_info_list in config["RECHEME"].items():
-            if isinstance(api_info_list, list):
-                for api_info in api_info_list:
-                    host = api_info.get("URL", "").rstrip('/')
-                    manage = api_info.get("MANAGE", True)
-                    try:
-                        recheme = create_recheme_instance(api_info, rec_name)
-                        response = recheme._make_request("room")
-                        if response is not None:
-                            servers.append(RecServerInfo(
-                                recName=rec_name,
-                                recType="recheme",
-                                recHost=host,
-                                recStatus="online",
-                                recManage=manage
-                            ))
-                        else:
-                            servers.append(RecServerInfo(
-                                recName=rec_name,
-                                recType="recheme",
-                                recHost=host,
-                                recStatus="offline",
-                                recManage=manage
-                            ))
-                    except Exception as e:
-                        logger.error(f"[录播姬] {rec_name} 状态检查失败: {e}")
-                        servers.append(RecServerInfo(
-                            recName=rec_name,
-                            recType="recheme",
-                            recHost=host,
-                            recStatus="error",
-                            recManage=manage
-                        ))
-
-    if "BLREC" in config:
-        for rec_name, api_info_list in config["BLREC"].items():
-            if isinstance(api_info_list, list):
-                for api_info in api_info_list:
-                    host = api_info.get("URL", "").rstrip('/')
-                    manage = api_info.get("MANAGE", True)
-                    try:
-                        blrec = create_blrec_instance(api_info, rec_name)
-                        response = blrec._make_request("tasks/data")
-                        if response is not None:
-                            servers.append(RecServerInfo(
-                                recName=rec_name,
-                                recType="blrec",
-                                recHost=host,
-                                recStatus="online",
-                                recManage=manage
-                            ))
-                        else:
-                            servers.append(RecServerInfo(
-                                recName=rec_name,
-                                recType="blrec",
-                                recHost=host,
-                                recStatus="offline",
-                                recManage=manage
-                            ))
-                    except Exception as e:
-                        logger.error(f"[BLREC] {rec_name} 状态检查失败: {e}")
-                        servers.append(RecServerInfo(
-                            recName=rec_name,
-                            recType="blrec",
-                            recHost=host,
-                            recStatus="error",
-                            recManage=manage
-                        ))
-    
+    async def check(rec_type: str, rec_name: str, api_info: Dict) -> RecServerInfo:
+        host = api_info.get("URL", "").rstrip('/')
+        manage = api_info.get("MANAGE", True)
+        try:
+            client = create_rec_instance(rec_type, api_info, rec_name)
+            endpoint = "room" if rec_type == "recheme" else "tasks/data"
+            response = await asyncio.to_thread(client._make_request, endpoint)
+            status = "online" if response is not None else "offline"
+        except Exception as e:
+            logger.error(f"[{'录播姬' if rec_type == 'recheme' else 'BLREC'}] {rec_name} 状态检查失败: {e}")
+            status = "error"
+        return RecServerInfo(
+            recName=rec_name,
+            recType=rec_type,
+            recHost=host,
+            recStatus=status,
+            recManage=manage
+        )
+
+    async def check_site(client: RecStutasAPI) -> List[RecServerInfo]:
+        servers = await asyncio.to_thread(client.fetch_servers)
+        if servers is None:
+            return [RecServerInfo(
+                recName=client.name,
+                recType=client.rec_type,
+                recHost=client.host,
+                recStatus="offline",
+                recManage=False,
+                recSite=client.name
+            )]
+        # 其他面板的录播机只读
+        return [RecServerInfo(**dict(server, recManage=False)) for server in servers]
+
+    servers = list(await asyncio.gather(*(check(*target) for target in iter_recorders())))
+    for site_servers in await asyncio.gather(*(check_site(client) for client in site_targets())):
+        servers.extend(site_servers)
     return servers
 
+def upstream_options(api_info: Dict) -> Dict:
+    """获取录播机地址的请求限制与超时配置，地址中未设置的使用 UPSTREAM 全局设置"""
+    options = dict(config.get("UPSTREAM", {}) or {})
+    for key in [
+        "MAX_CONCURRENCY", "RATE_LIMIT", "RATE_BURST", "QUEUE_TIMEOUT",
+        "CONNECT_TIMEOUT", "READ_TIMEOUT", "ADAPTIVE_TIMEOUT", "TIMEOUT_PERCENTILE",
+        "TIMEOUT_MULTIPLIER", "MIN_TIMEOUT", "MAX_TIMEOUT"
+    ]:
+        if key in api_info:
+            options[key] = api_info[key]
+    return options
+
 def create_recheme_instance(api_info: Dict, rec_name: str) -> RechemeAPI:
     """
     录播姬 API
@@ -279,6 +431,7 @@ def create_recheme_instance(api_info: Dict, rec_name: str) -> RechemeAPI:
     """
     host = api_info.get("URL", "").rstrip('/')
     manage = api_info.get("MANAGE", True)
+    options = upstream_options(api_info)
     
     basic_auth = api_info.get("BASIC", config.get("RECHEME", {}).get("BASIC", False))
     username = api_info.get("BASIC_USER", config.get("RECHEME", {}).get("BASIC_USER", ""))
@@ -290,7 +443,9 @@ def create_recheme_instance(api_info: Dict, rec_name: str) -> RechemeAPI:
         basic_auth=basic_auth,
         username=username,
         password=password,
-        manage=manage
+        manage=manage,
+        limiter=get_limiter(host, options),
+        timeouts=get_timeout_policy(host, options)
     )
 
 def create_blrec_instance(api_info: Dict, name: str) -> BLRECAPI:
@@ -302,6 +457,7 @@ def create_blrec_instance(api_info: Dict, name: str) -> BLRECAPI:
     """
     host = api_info.get("URL", "").rstrip('/')
     manage = api_info.get("MANAGE", True)
+    options = upstream_options(api_info)
     
     basic_auth = api_info.get("BASIC", config.get("BLREC", {}).get("BASIC", True))
     api_key = api_info.get("BASIC_KEY", config.get("BLREC", {}).get("BASIC_KEY", "bili2233"))
@@ -310,9 +466,136 @@ def create_blrec_instance(api_info: Dict, name: str) -> BLRECAPI:
         host=host,
         name=name,
         api_key=api_key if basic_auth else "",
-        manage=manage
+        manage=manage,
+        limiter=get_limiter(host, options),
+        timeouts=get_timeout_policy(host, options)
+    )
+
+def iter_recorders(recType: str = None, recName: str = None):
+    """
+    遍历配置中的录播机
+    :param recType: 录播类型，不指定时遍历全部
+    :param recName: 录播机名称，不指定时遍历全部
+    :return: (录播类型, 名称, API配置信息)
+    """
+    if (not recType or recType == "recheme") and "RECHEME" in config:
+        for rec_name, api_info_list in config["RECHEME"].items():
+            if recName and rec_name != recName:
+                continue
+            if isinstance(api_info_list, list):
+                for api_info in api_info_list:
+                    yield "recheme", rec_name, api_info
+
+    if (not recType or recType == "blrec") and "BLREC" in config:
+        for rec_name, api_info_list in config["BLREC"].items():
+            if recName and rec_name != recName:
+                continue
+            if isinstance(api_info_list, list) and rec_name not in ["BLREC_BASIC", "BLREC_BASIC_KEY"]:
+                for api_info in api_info_list:
+                    yield "blrec", rec_name, api_info
+
+def create_recstutas_instance(api_info: Dict, name: str) -> RecStutasAPI:
+    """
+    其他 RecStutas 面板 API
+    :param api_info: API配置信息
+    :param name: 站点名称
+    :return: RecStutasAPI实例
+    """
+    host = api_info.get("URL", "").rstrip('/')
+    options = upstream_options(api_info)
+
+    return RecStutasAPI(
+        host=host,
+        name=name,
+        token=api_info.get("TOKEN", ""),
+        limiter=get_limiter(host, options),
+        timeouts=get_timeout_policy(host, options),
+        full_sync_interval=api_info.get("FULL_SYNC_INTERVAL", FULL_SYNC_INTERVAL)
     )
 
+def iter_sites():
+    """
+    遍历配置中的其他 RecStutas 面板
+    :return: (站点名称, API配置信息)
+    """
+    for site_name, api_info_list in (config.get("RECSTUTAS", {}) or {}).items():
+        if isinstance(api_info_list, list):
+            for api_info in api_info_list:
+                yield site_name, api_info
+
+def site_targets(recType: str = None) -> List[RecStutasAPI]:
+    """
+    获取其他 RecStutas 面板 API 实例，只用于读取直播间列表
+    :param recType: 录播类型，指定 recstutas 以外的类型时返回空列表
+    """
+    if recType and recType != "recstutas":
+        return []
+    return [create_recstutas_instance(api_info, site_name) for site_name, api_info in iter_sites()]
+
+def create_rec_instance(rec_type: str, api_info: Dict, rec_name: str) -> Union[RechemeAPI, BLRECAPI]:
+    """按录播类型创建 API 实例"""
+    if rec_type == "recheme":
+        return create_recheme_instance(api_info, rec_name)
+    return create_blrec_instance(api_info, rec_name)
+
+def rec_targets(recType: str = None, recName: str = None) -> List[Union[RechemeAPI, BLRECAPI, ReplicaClient]]:
+    """
+    获取录播机 API 实例
+    REPLICA.NAMES 中的录播机，同一名称下的多个地址合并为一个多线路实例，其余每个地址一个实例
+    """
+    replica_config = config.get("REPLICA", {}) or {}
+    replica_names = replica_config.get("NAMES") or []
+
+    targets, groups = [], {}
+    for rec_type, rec_name, api_info in iter_recorders(recType, recName):
+        client = create_rec_instance(rec_type, api_info, rec_name)
+        if rec_name not in replica_names:
+            targets.append(client)
+            continue
+        if (rec_type, rec_name) not in groups:
+            groups[(rec_type, rec_name)] = []
+            targets.append(groups[(rec_type, rec_name)])
+        groups[(rec_type, rec_name)].append(client)
+
+    return [
+        ReplicaClient(
+            target,
+            hedge_delay=replica_config.get("HEDGE_DELAY", 0.5),
+            cooldown=replica_config.get("COOLDOWN", 30)
+        ) if isinstance(target, list) else target
+        for target in targets
+    ]
+
+async def get_recorder_loads(recType: str = None) -> List[RecorderLoad]:
+    """获取可管理录播机的负载"""
+    clients = [client for client in rec_targets(recType) if client.manage]
+    await room_aggregator.get_rooms(clients)
+
+    candidates = {}
+    for client in clients:
+        if (client.rec_type, client.name) in candidates:
+            continue
+        load = state_store.recorder_load(client.rec_type, client.name)
+        candidates[(client.rec_type, client.name)] = RecorderLoad(
+            client.rec_type,
+            client.name,
+            rooms=load["rooms"],
+            recording=load["recording"],
+            bitrate=load["bitrate"],
+            disk=load["disk"],
+            online=room_aggregator.is_online(client.rec_type, client.name)
+        )
+    return list(candidates.values())
+
+async def place_room(room_id: int, recType: str = None) -> Union[Dict, None]:
+    """
+    按录播机负载为新直播间选择目标录播机
+    :param room_id: 房间号
+    :param recType: 录播类型，不指定时在全部录播机中选择
+    :return: 分配结果
+    """
+    return placement_engine.place(room_id, await get_recorder_loads(recType))
+
 def handle_operation_error(operation: str, recType: str, recName: str = None, user: str = None) -> str:
     """处理错误"""
     base_msg = f"{operation}失败"
@@ -327,23 +610,219 @@ async def get_rooms(recType: str = None):
     if recType:
         logger.debug(f"[API] 指定录播类型: {recType}")
 
-    rooms = []
-    
-    if (not recType or recType == "recheme") and "RECHEME" in config:
-        for rec_name, api_info_list in config["RECHEME"].items():
-            if isinstance(api_info_list, list):
-                for api_info in api_info_list:
-                    recheme = create_recheme_instance(api_info, rec_name)
-                    rooms.extend(recheme.get_rooms())
-    
-    if (not recType or recType == "blrec") and "BLREC" in config:
-        for rec_name, api_info_list in config["BLREC"].items():
-            if isinstance(api_info_list, list) and rec_name not in ["BLREC_BASIC", "BLREC_BASIC_KEY"]:
-                for api_info in api_info_list:
-                    blrec = create_blrec_instance(api_info, rec_name)
-                    rooms.extend(blrec.get_rooms())
+    clients = rec_targets(recType) + site_targets(recType)
+    return await room_aggregator.get_rooms(clients)
+
+@app.get("/api/room/stats")
+async def get_rooms_stats(recType: str = None, recName: str = None, roomIds: str = None):
+    """
+    批量获取直播间统计信息
+    :param roomIds: 房间号列表，逗号分隔，不指定时返回全部直播间
+    """
+    if recType and recType not in ["recheme", "blrec"]:
+        raise HTTPException(status_code=400, detail="不支持的录播类型")
+
+    wanted = None
+    if roomIds:
+        try:
+            wanted = {int(room_id) for room_id in roomIds.split(",") if room_id.strip()}
+        except ValueError:
+            raise HTTPException(status_code=400, detail="roomIds 格式错误")
+    logger.debug(f"[API] 请求批量获取直播间统计信息，共 {len(wanted) if wanted else '全部'} 个")
+
+    async def collect(client):
+        rooms = await room_aggregator.get_rooms([client])
+        room_ids = [
+            room_id for room_id in map(room_id_of, rooms)
+            if room_id is not None and (wanted is None or room_id in wanted)
+        ]
+        return await stats_collector.collect(client, room_ids)
+
+    clients = rec_targets(recType, recName)
+    results = await asyncio.gather(*(collect(client) for client in clients))
+    data = [item for items in results for item in items]
+    return {"total": len(data), "data": data}
+
+@app.get("/api/room/export")
+async def export_rooms(recType: str = None, recName: str = None, format: str = "csv"):
+    """
+    流式导出直播间与录播机的对应关系
+    :param format: csv 或 ndjson
+    """
+    if format not in ["csv", "ndjson"]:
+        raise HTTPException(status_code=400, detail="不支持的导出格式，必须是 csv 或 ndjson")
+    logger.debug(f"[API] 请求导出直播间分配 ({format})")
+
+    clients = rec_targets(recType, recName)
+    snapshots = await room_aggregator.get_snapshots(clients)
+
+    def rows():
+        yield export_header(format)
+        for client, snapshot in snapshots:
+            for room in snapshot.rooms:
+                view = room_view(room)
+                if view is None:
+                    continue
+                yield export_line(format, {
+                    "roomId": view["roomId"],
+                    "recName": client.name,
+                    "recType": client.rec_type,
+                    "autoRecord": view["autoRecord"]
+                })
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=rooms.{format}"}
+    )
+
+@app.post("/api/room/import")
+@requires_auth
+async def import_rooms(
+    request: Request,
+    format: str = None,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    流式导入直播间分配，逐行解析并创建直播间
+    每行包含 roomId / recName (目标录播机，可为空) / autoRecord，支持 CSV 与 NDJSON
+    :param format: csv 或 ndjson，不指定时根据内容判断
+    """
+    logger.debug(f"[API] 用户 {current_user} 请求导入直播间分配")
+    if format not in [None, "csv", "ndjson"]:
+        raise HTTPException(status_code=400, detail="不支持的导入格式，必须是 csv 或 ndjson")
+
+    summary = {"total": 0, "succeeded": 0, "failed": 0, "errors": []}
+    queue = asyncio.Queue(maxsize=job_manager.concurrency * 2)
+
+    def add_error(line_no: int, room_id: int, error: str):
+        summary["failed"] += 1
+        if len(summary["errors"]) < 100:
+            summary["errors"].append({"line": line_no, "roomId": room_id, "error": error})
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            line_no, row = item
+            try:
+                await _create_single_room(
+                    CreateRoomRequest(roomId=row["roomId"], autoRecord=row["autoRecord"]),
+                    row["recType"],
+                    row["recName"],
+                    current_user
+                )
+                summary["succeeded"] += 1
+            except HTTPException as e:
+                add_error(line_no, row["roomId"], e.detail)
+            except Exception as e:
+                logger.error(f"[API] 导入第 {line_no} 行失败: {e}")
+                add_error(line_no, row["roomId"], str(e))
+
+    workers = [asyncio.create_task(worker()) for _ in range(job_manager.concurrency)]
+    try:
+        async for line_no, row, error in iter_import_rows(request.stream(), format):
+            summary["total"] += 1
+            if error:
+                add_error(line_no, None, error)
+                continue
+            await queue.put((line_no, row))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="导入文件必须是 UTF-8 编码")
+    finally:
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    logger.debug(f"[API] 导入完成，共 {summary['total']} 行，成功: {summary['succeeded']}，失败: {summary['failed']}")
+    summary["errors"] = summary["errors"] or None
+    return summary
+
+@app.get("/api/summary")
+async def get_summary():
+    """获取直播间汇总统计"""
+    if not state_store.loaded:
+        await get_rooms()
+    return state_store.summary()
+
+@app.get("/api/room/changes")
+async def get_room_changes(since: int = 0, limit: int = 500):
+    """
+    获取直播间状态变化
+    :param since: 上次获取到的版本号，返回之后的变化
+    """
+    return state_store.changes(since, min(max(limit, 1), 1000))
+
+@app.get("/api/room/duplicates")
+async def get_duplicate_rooms():
+    """获取在多个录播机中重复添加的直播间，以及重复录制浪费的码率"""
+    await get_rooms()
+    return state_store.duplicates()
+
+@app.post("/api/room/duplicates/resolve")
+@requires_auth
+async def resolve_duplicate_rooms(
+    request: ResolveDuplicatesRequest,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    处理重复添加的直播间，每个直播间只保留一份
+    优先保留正在录制、码率最高、所在录播机直播间最少的一份，其余从可管理的录播机中删除
+    dryRun 为 true 时只返回处理计划
+    """
+    logger.debug(f"[API] 用户 {current_user} 请求处理重复直播间")
+    clients = rec_targets()
+    await room_aggregator.get_rooms(clients)
+    manageable = {(client.rec_type, client.name): client.manage for client in clients}
+
+    wanted = set(request.roomIds) if request.roomIds is not None else None
+    plan = []
+    for duplicate in state_store.duplicates()["data"]:
+        if wanted is not None and duplicate["roomId"] not in wanted:
+            continue
+        # 其他面板的直播间只读，不参与保留与删除的选择
+        copies = sorted(
+            (item for item in duplicate["recorders"] if item["recType"] != "recstutas"),
+            key=lambda item: (
+                not item["recording"],
+                -item["bitrate"],
+                state_store.recorder_load(item["recType"], item["recName"])["rooms"]
+            )
+        )
+        if len(copies) < 2:
+            continue
+        plan.append({
+            "roomId": duplicate["roomId"],
+            "keep": {"recType": copies[0]["recType"], "recName": copies[0]["recName"]},
+            "remove": [
+                {
+                    "recType": item["recType"],
+                    "recName": item["recName"],
+                    "manage": manageable.get((item["recType"], item["recName"]), False)
+                }
+                for item in copies[1:]
+            ]
+        })
+
+    if request.dryRun:
+        return {"dryRun": True, "total": len(plan), "data": plan}
+
+    async def remove(room_id: int, item: Dict) -> Dict:
+        if not item["manage"]:
+            return dict(item, success=False, error="录播机不可管理")
+        try:
+            await _delete_single_room(room_id, item["recType"], item["recName"], current_user)
+            return dict(item, success=True)
+        except HTTPException as e:
+            return dict(item, success=False, error=e.detail)
 
-    return rooms
+    for entry in plan:
+        entry["remove"] = list(await asyncio.gather(*(remove(entry["roomId"], item) for item in entry["remove"])))
+    removed = sum(1 for entry in plan for item in entry["remove"] if item["success"])
+    logger.info(f"[API] 用户 {current_user} 处理重复直播间 {len(plan)} 个，删除 {removed} 份副本")
+    return {"dryRun": False, "total": len(plan), "removed": removed, "data": plan}
 
 @app.post("/api/room")
 @requires_auth
@@ -380,15 +859,27 @@ async def create_room(
 @requires_auth
 async def batch_create_rooms(
     request: BatchCreateRoomRequest,
+    background: bool = False,
     current_user: str = Depends(get_current_user)
 ):
     """
     批量创建直播间
+    background 为 true 时提交为后台任务，立即返回任务ID
     """
     logger.debug(f"[API] 用户 {current_user} 请求批量创建直播间")
     logger.debug(f"[API] 请求批量创建 {len(request.rooms)} 个直播间")
     recType = request.recType
     recName = request.recName
+
+    if background:
+        job = job_manager.submit(
+            "room_create",
+            request.rooms,
+            lambda room_request: _create_single_room(room_request, recType, recName, current_user),
+            current_user
+        )
+        return job.progress(include_items=False)
+
     all_results = []
     
     for room_request in request.rooms:
@@ -406,48 +897,40 @@ async def batch_create_rooms(
     
     return {"data": all_results}
 
+@audited("room.create")
 async def _create_single_room(request: CreateRoomRequest, recType: str = None, recName: str = None, current_user: str = None):
     """创建单个房间"""
     success_results = []
+
+    placement = None
+    if not recName and placement_engine.enabled:
+        placement = await place_room(request.roomId, recType)
+        if placement:
+            recName = placement["recName"]
+            recType = placement["recType"]
     
-    if recName:
+    if recName and not recType:
         if "RECHEME" in config and any(recName == name for name in config["RECHEME"]):
             recType = "recheme"
         elif "BLREC" in config and any(recName == name for name in config["BLREC"]):
             recType = "blrec"
     
-    if (not recType or recType == "recheme") and "RECHEME" in config:
-        for rec_name, api_info_list in config["RECHEME"].items():
-            if recName and rec_name != recName:
-                continue
-            
-            if isinstance(api_info_list, list):
-                for api_info in api_info_list:
-                    recheme = create_recheme_instance(api_info, rec_name)
-                    result = recheme.create_room(request.roomId, request.autoRecord)
-                    if result:
-                        success_results.append(result)
-    
-    if (not recType or recType == "blrec") and "BLREC" in config:
-        for rec_name, api_info_list in config["BLREC"].items():
-            if recName and rec_name != recName:
-                continue
-                
-            if isinstance(api_info_list, list) and rec_name not in ["BLREC_BASIC", "BLREC_BASIC_KEY"]:
-                for api_info in api_info_list:
-                    blrec = create_blrec_instance(api_info, rec_name)
-                    result = blrec.create_room(request.roomId)
-                    if result:
-                        success_results.append(result)
+    for client in rec_targets(recType, recName):
+        result = await asyncio.to_thread(client.create_room, request.roomId, request.autoRecord)
+        if result:
+            state_store.update_room(client.rec_type, client.name, client.host, result)
+            success_results.append(result)
     
     if not success_results:
         error_msg = handle_operation_error("创建直播间", recType or "所有", recName, current_user)
         log_print(f"[API] {error_msg}", "ERROR")
         raise HTTPException(status_code=500, detail=error_msg)
     
+    if placement:
+        return {"data": success_results, "placement": placement}
     return {"data": success_results}
 
-@app.delete("/api/room/{roomId}")
+@app.delete("/api/room/{roomId:int}")
 @requires_auth
 async def delete_room(
     roomId: int,
@@ -465,13 +948,29 @@ async def delete_room(
 @requires_auth
 async def batch_delete_rooms(
     request: BatchDeleteRoomRequest,
+    background: bool = False,
     current_user: str = Depends(get_current_user)
 ):
     """
     批量删除房间
+    background 为 true 时提交为后台任务，立即返回任务ID
     """
     logger.debug(f"[API] 用户 {current_user} 请求批量删除房间")
     logger.debug(f"[API] 请求批量删除 {len(request.rooms)} 个直播间")
+
+    if background:
+        job = job_manager.submit(
+            "room_delete",
+            request.rooms,
+            lambda room_request: _delete_single_room(
+                room_request.roomId,
+                room_request.recType,
+                room_request.recName,
+                current_user
+            ),
+            current_user
+        )
+        return job.progress(include_items=False)
     
     all_results = []
     failed_rooms = []
@@ -505,6 +1004,7 @@ async def batch_delete_rooms(
         "errors": failed_rooms if failed_rooms else None
     }
 
+@audited("room.delete")
 async def _delete_single_room(roomId: int, recType: str = None, recName: str = None, current_user: str = None):
     """删除单个房间"""
     logger.debug(f"[API] 请求删除房间ID为 {roomId} 的直播间")
@@ -513,51 +1013,28 @@ async def _delete_single_room(roomId: int, recType: str = None, recName: str = N
     
     success_results = []
     
-    if recName:
+    if recName and not recType:
         if "RECHEME" in config and any(recName == name for name in config["RECHEME"]):
             recType = "recheme"
         elif "BLREC" in config and any(recName == name for name in config["BLREC"]):
             recType = "blrec"
     
-    if (not recType or recType == "recheme") and "RECHEME" in config:
-        for rec_name, api_info_list in config["RECHEME"].items():
-            if recName and rec_name != recName:
-                continue
-            
-            if isinstance(api_info_list, list):
-                for api_info in api_info_list:
-                    recheme = create_recheme_instance(api_info, rec_name)
-                    result = recheme.delete_room(roomId)
-                    if result:
-                        success_results.append({
-                            "roomid": roomId,
-                            "recServer": {
-                                "recName": rec_name,
-                                "recType": "recheme",
-                                "recHost": api_info["URL"],
-                                "recManage": api_info.get("MANAGE", True)
-                            }
-                        })
-    
-    if (not recType or recType == "blrec") and "BLREC" in config:
-        for rec_name, api_info_list in config["BLREC"].items():
-            if recName and rec_name != recName:
-                continue
-            
-            if isinstance(api_info_list, list) and rec_name not in ["BLREC_BASIC", "BLREC_BASIC_KEY"]:
-                for api_info in api_info_list:
-                    blrec = create_blrec_instance(api_info, rec_name)
-                    result = blrec.delete_room(str(roomId))
-                    if result is not None:
-                        success_results.append({
-                            "roomid": roomId,
-                            "recServer": {
-                                "recName": rec_name,
-                                "recType": "blrec",
-                                "recHost": api_info["URL"],
-                                "recManage": api_info.get("MANAGE", True)
-                            }
-                        })
+    for client in rec_targets(recType, recName):
+        if client.rec_type == "recheme":
+            success = bool(await asyncio.to_thread(client.delete_room, roomId))
+        else:
+            success = await asyncio.to_thread(client.delete_room, str(roomId)) is not None
+        if success:
+            state_store.remove_room(client.rec_type, client.name, client.host, roomId)
+            success_results.append({
+                "roomid": roomId,
+                "recServer": {
+                    "recName": client.name,
+                    "recType": client.rec_type,
+                    "recHost": client.host,
+                    "recManage": client.manage
+                }
+            })
     
     if not success_results:
         error_msg = handle_operation_error("删除直播间", recType or "所有", recName, current_user)
@@ -572,25 +1049,14 @@ async def get_room_by_id(roomId: int, recType: str = None):
     if recType and recType not in ["recheme", "blrec"]:
         raise HTTPException(status_code=400, detail="不支持的录播类型")
 
+    clients = rec_targets(recType)
+    results = await asyncio.gather(*(asyncio.to_thread(client.get_room, str(roomId)) for client in clients))
+
     room_data = []
-    
-    if recType in [None, "recheme"] and "RECHEME" in config:
-        for rec_name, api_info_list in config["RECHEME"].items():
-            if isinstance(api_info_list, list):
-                for api_info in api_info_list:
-                    recheme = create_recheme_instance(api_info, rec_name)
-                    data = recheme.get_room(roomId)
-                    if data:
-                        room_data.append(data)
-    
-    if recType in [None, "blrec"] and "BLREC" in config:
-        for rec_name, api_info_list in config["BLREC"].items():
-            if isinstance(api_info_list, list) and rec_name not in ["BLREC_BASIC", "BLREC_BASIC_KEY"]:
-                for api_info in api_info_list:
-                    blrec = create_blrec_instance(api_info, rec_name)
-                    data = blrec.get_room(str(roomId))
-                    if data:
-                        room_data.append(data)
+    for client, data in zip(clients, results):
+        if data:
+            state_store.update_room(client.rec_type, client.name, client.host, data)
+            room_data.append(data)
 
     if not room_data:
         error_msg = {
@@ -601,8 +1067,128 @@ async def get_room_by_id(roomId: int, recType: str = None):
     
     return {"data": room_data}
 
+@app.get("/api/room/search")
+async def search_rooms(q: str = "", limit: int = 20, recType: str = None):
+    """
+    搜索直播间，按名称、标题、分区与房间号匹配，用于输入时提示
+    :param q: 查询文本
+    :param limit: 返回数量
+    """
+    if recType and recType not in ["recheme", "blrec", "recstutas"]:
+        raise HTTPException(status_code=400, detail="不支持的录播类型")
+    # 汇总数据未过期时不请求录播机，索引只应用之后的变化
+    await room_aggregator.get_snapshots(rec_targets(recType) + site_targets(recType))
+    return await asyncio.to_thread(search_index.search, q, min(max(limit, 1), 100), recType)
+
+@app.post("/api/room/lookup")
+async def lookup_rooms(request: LookupRoomsRequest):
+    """
+    批量查询直播间所在的录播机与状态
+    每个录播机最多请求一次直播间列表，之后全部从汇总数据中查询
+    """
+    if request.recType and request.recType not in ["recheme", "blrec", "recstutas"]:
+        raise HTTPException(status_code=400, detail="不支持的录播类型")
+    room_ids = list(dict.fromkeys(request.roomIds))
+    if len(room_ids) > LOOKUP_LIMIT:
+        raise HTTPException(status_code=400, detail=f"单次最多查询 {LOOKUP_LIMIT} 个直播间")
+    logger.debug(f"[API] 批量查询 {len(room_ids)} 个直播间")
+
+    await get_rooms(request.recType)
+    locations = state_store.lookup(room_ids)
+
+    data = []
+    for room_id in room_ids:
+        recorders = [
+            {
+                "recType": item["recType"],
+                "recName": item["recName"],
+                "recHost": item["recHost"],
+                "name": item["view"]["name"],
+                "title": item["view"]["title"],
+                "area": item["view"]["area"],
+                "live": item["view"]["live"],
+                "recording": item["view"]["recording"],
+                "autoRecord": item["view"]["autoRecord"],
+                "bitrate": item["view"]["bitrate"]
+            }
+            for item in locations[room_id]
+            if not request.recType or item["recType"] == request.recType
+        ]
+        data.append({
+            "roomId": room_id,
+            "found": bool(recorders),
+            "live": any(item["live"] for item in recorders),
+            "recording": any(item["recording"] for item in recorders),
+            "duplicate": sum(1 for item in recorders if item["recType"] != "recstutas") > 1,
+            "recorders": recorders
+        })
+    return {
+        "total": len(data),
+        "found": sum(1 for item in data if item["found"]),
+        "data": data
+    }
+
+@app.get("/api/room/config")
+@requires_auth
+async def get_rooms_config(
+    recType: str = None,
+    recName: str = None,
+    roomIds: str = None,
+    refresh: bool = False,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    批量获取直播间设置，已缓存的直接返回，其余并行获取
+    :param roomIds: 房间号列表，逗号分隔，不指定时返回全部直播间
+    :param refresh: 是否跳过缓存重新获取
+    """
+    if recType and recType not in ["recheme", "blrec"]:
+        raise HTTPException(status_code=400, detail="不支持的录播类型")
+    wanted = None
+    if roomIds:
+        try:
+            wanted = {int(room_id) for room_id in roomIds.split(",") if room_id.strip()}
+        except ValueError:
+            raise HTTPException(status_code=400, detail="roomIds 格式错误")
+
+    async def collect(client, snapshot) -> List[Dict]:
+        semaphore = asyncio.Semaphore(8)
+
+        async def fetch(room_id: int) -> Dict:
+            async with semaphore:
+                room_config = await asyncio.to_thread(client.get_room_config, str(room_id), refresh)
+            return {"roomId": room_id, "recName": client.name, "recType": client.rec_type, "config": room_config}
+
+        room_ids = [
+            room_id for room_id in map(room_id_of, snapshot.rooms)
+            if room_id is not None and (wanted is None or room_id in wanted)
+        ]
+        return await asyncio.gather(*(fetch(room_id) for room_id in room_ids))
+
+    snapshots = await room_aggregator.get_snapshots(rec_targets(recType, recName))
+    results = await asyncio.gather(*(collect(client, snapshot) for client, snapshot in snapshots))
+    data = [item for items in results for item in items]
+    return {"total": len(data), "data": data}
+
+@app.get("/api/room/{roomId}/config")
+@requires_auth
+async def get_room_config(
+    roomId: int,
+    recType: str = None,
+    recName: str = None,
+    refresh: bool = False,
+    current_user: str = Depends(get_current_user)
+):
+    """获取指定直播间的设置"""
+    result = await get_rooms_config(recType, recName, str(roomId), refresh, current_user=current_user)
+    data = [item for item in result["data"] if item["config"] is not None]
+    if not data:
+        raise HTTPException(status_code=404, detail="无法获取该直播间的设置")
+    return {"data": data}
+
 @app.post("/api/room/{roomId}/config")
 @requires_auth
+@audited("room.config")
 async def update_room_config(
     roomId: int,
     request: RoomConfigRequest,
@@ -620,17 +1206,10 @@ async def update_room_config(
         raise HTTPException(status_code=400, detail="当前只支持录播姬配置修改")
     
     success_results = []
-    if "RECHEME" in config:
-        for rec_name, api_info_list in config["RECHEME"].items():
-            if recName and rec_name != recName:
-                continue
-                
-            if isinstance(api_info_list, list):
-                for api_info in api_info_list:
-                    recheme = create_recheme_instance(api_info, rec_name)
-                    result = recheme.update_room_config(roomId, request.dict())
-                    if result:
-                        success_results.append(result)
+    for client in rec_targets("recheme", recName):
+        result = await asyncio.to_thread(client.update_room_config, roomId, request.dict())
+        if result:
+            success_results.append(result)
     
     if not success_results:
         error_msg = handle_operation_error("修改房间设置", recType, recName, current_user)
@@ -640,6 +1219,7 @@ async def update_room_config(
 
 @app.post("/api/room/{roomId}/start")
 @requires_auth
+@audited("room.start")
 async def start_room_recording(
     roomId: int,
     recType: str = "recheme",
@@ -655,17 +1235,10 @@ async def start_room_recording(
         raise HTTPException(status_code=400, detail="当前只支持录播姬录制")
     
     success_results = []
-    if "RECHEME" in config:
-        for rec_name, api_info_list in config["RECHEME"].items():
-            if recName and rec_name != recName:
-                continue
-
-            if isinstance(api_info_list, list):
-                for api_info in api_info_list:
-                    recheme = create_recheme_instance(api_info, rec_name)
-                    result = recheme.start_recording(roomId)
-                    if result:
-                        success_results.append(result)
+    for client in rec_targets("recheme", recName):
+        result = await asyncio.to_thread(client.start_recording, roomId)
+        if result:
+            success_results.append(result)
 
     if not success_results:
         error_msg = handle_operation_error("开始录制", recType, recName, current_user)
@@ -675,6 +1248,7 @@ async def start_room_recording(
 
 @app.post("/api/room/{roomId}/stop")
 @requires_auth
+@audited("room.stop")
 async def stop_room_recording(
     roomId: int,
     recType: str = "recheme",
@@ -690,17 +1264,10 @@ async def stop_room_recording(
         raise HTTPException(status_code=400, detail="当前只支持录播姬录制")
     
     success_results = []
-    if "RECHEME" in config:
-        for rec_name, api_info_list in config["RECHEME"].items():
-            if recName and rec_name != recName:
-                continue
-                
-            if isinstance(api_info_list, list):
-                for api_info in api_info_list:
-                    recheme = create_recheme_instance(api_info, rec_name)
-                    result = recheme.stop_recording(roomId)
-                    if result:
-                        success_results.append(result)
+    for client in rec_targets("recheme", recName):
+        result = await asyncio.to_thread(client.stop_recording, roomId)
+        if result:
+            success_results.append(result)
     
     if not success_results:
         error_msg = handle_operation_error("停止录制", recType, recName, current_user)
@@ -710,6 +1277,7 @@ async def stop_room_recording(
 
 @app.post("/api/room/{roomId}/split")
 @requires_auth
+@audited("room.split")
 async def split_room_recording(
     roomId: int,
     recType: str = "recheme",
@@ -725,17 +1293,10 @@ async def split_room_recording(
         raise HTTPException(status_code=400, detail="当前只支持录播姬分段")
     
     success_results = []
-    if "RECHEME" in config:
-        for rec_name, api_info_list in config["RECHEME"].items():
-            if recName and rec_name != recName:
-                continue
-                
-            if isinstance(api_info_list, list):
-                for api_info in api_info_list:
-                    recheme = create_recheme_instance(api_info, rec_name)
-                    result = recheme.split_recording(roomId)
-                    if result:
-                        success_results.append(result)
+    for client in rec_targets("recheme", recName):
+        result = await asyncio.to_thread(client.split_recording, roomId)
+        if result:
+            success_results.append(result)
     
     if not success_results:
         error_msg = handle_operation_error("手动分段", recType, recName, current_user)
@@ -745,6 +1306,7 @@ async def split_room_recording(
 
 @app.post("/api/room/{roomId}/refresh")
 @requires_auth
+@audited("room.refresh")
 async def refresh_room(
     roomId: int,
     recType: str = "recheme",
@@ -760,17 +1322,10 @@ async def refresh_room(
         raise HTTPException(status_code=400, detail="当前只支持录播姬刷新")
     
     success_results = []
-    if "RECHEME" in config:
-        for rec_name, api_info_list in config["RECHEME"].items():
-            if recName and rec_name != recName:
-                continue
-                
-            if isinstance(api_info_list, list):
-                for api_info in api_info_list:
-                    recheme = create_recheme_instance(api_info, rec_name)
-                    result = recheme.refresh_room(roomId)
-                    if result:
-                        success_results.append(result)
+    for client in rec_targets("recheme", recName):
+        result = await asyncio.to_thread(client.refresh_room, roomId)
+        if result:
+            success_results.append(result)
     
     if not success_results:
         error_msg = handle_operation_error("刷新房间信息", recType, recName, current_user)
@@ -778,6 +1333,171 @@ async def refresh_room(
     
     return {"data": success_results}
 
+@app.post("/api/webhook/{recType}/{recName}")
+async def receive_webhook(recType: str, recName: str, request: Request, token: str = None):
+    """
+    接收录播姬 / BLREC 的 Webhook，立即更新直播间状态
+    录播机中填写的地址: http://面板地址/api/webhook/recheme/REC001?token=xxx
+    """
+    webhook_config = config.get("WEBHOOK", {}) or {}
+    if not webhook_config.get("ENABLE", False):
+        raise HTTPException(status_code=404, detail="Webhook 未启用")
+
+    expected = str(webhook_config.get("TOKEN") or "")
+    token = token or request.headers.get("X-Webhook-Token") or ""
+    if not expected or not hmac.compare_digest(token.encode(), expected.encode()):
+        logger.warning(f"[Webhook] {recType} {recName} 认证失败，来源: {request.client.host if request.client else '未知'}")
+        raise HTTPException(status_code=403, detail="Webhook 认证失败")
+
+    if recType not in ["recheme", "blrec"]:
+        raise HTTPException(status_code=400, detail="不支持的录播类型")
+    if not any(True for _ in iter_recorders(recType, recName)):
+        raise HTTPException(status_code=404, detail=f"录播机 {recName} 不存在")
+
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Webhook 内容格式错误")
+    event = (parse_recheme_event if recType == "recheme" else parse_blrec_event)(payload if isinstance(payload, dict) else {})
+    if event is None:
+        return {"accepted": False}
+
+    updated = room_aggregator.apply_event(recType, recName, event["roomId"], event["fields"])
+    logger.debug(f"[Webhook] {recName} {event['event']} 房间 {event['roomId']}，更新 {updated} 个直播间")
+    return {"accepted": True, "event": event["event"], "roomId": event["roomId"], "updated": updated}
+
+## 批量控制支持的操作与对应的 API 方法，BLREC 不支持分段和刷新
+CONTROL_ACTIONS = {
+    "start": ("开始录制", {"recheme": "start_recording", "blrec": "start_recording"}),
+    "stop": ("停止录制", {"recheme": "stop_recording", "blrec": "stop_recording"}),
+    "split": ("手动分段", {"recheme": "split_recording"}),
+    "refresh": ("刷新房间信息", {"recheme": "refresh_room"})
+}
+
+@app.post("/api/room/control")
+@requires_auth
+async def bulk_control_rooms(
+    request: BulkControlRequest,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    批量控制直播间
+    按房间号列表或筛选条件 (录播机、是否直播中、是否录制中) 选择直播间，并行发送到所在的录播机
+    action: start / stop / split / refresh
+    """
+    if request.action not in CONTROL_ACTIONS:
+        raise HTTPException(status_code=400, detail="不支持的操作，必须是 start / stop / split / refresh")
+    if request.recType and request.recType not in ["recheme", "blrec"]:
+        raise HTTPException(status_code=400, detail="不支持的录播类型")
+    if request.roomIds is None and not request.recName and request.live is None and request.recording is None:
+        raise HTTPException(status_code=400, detail="必须指定房间号列表或筛选条件")
+    operation, methods = CONTROL_ACTIONS[request.action]
+    logger.debug(f"[API] 用户 {current_user} 请求批量{operation}")
+
+    wanted = set(request.roomIds) if request.roomIds is not None else None
+    targets = []
+    for client, snapshot in await room_aggregator.get_snapshots(rec_targets(request.recType, request.recName)):
+        for room in snapshot.rooms:
+            view = room_view(room)
+            if view is None:
+                continue
+            if wanted is not None and view["roomId"] not in wanted:
+                continue
+            if request.live is not None and view["live"] != request.live:
+                continue
+            if request.recording is not None and view["recording"] != request.recording:
+                continue
+            targets.append((client, view["roomId"]))
+
+    semaphores = {}
+    for client, _ in targets:
+        if id(client) not in semaphores:
+            semaphores[id(client)] = asyncio.Semaphore(getattr(client.limiter, "max_concurrency", 0) or 8)
+
+    async def dispatch(client, room_id: int) -> Dict:
+        outcome = {"roomId": room_id, "recName": client.name, "recType": client.rec_type}
+        method = methods.get(client.rec_type)
+        if method is None:
+            return dict(outcome, success=False, error=f"{client.rec_type} 不支持{operation}")
+        async with semaphores[id(client)]:
+            start = time.monotonic()
+            result = await asyncio.to_thread(
+                getattr(client, method),
+                room_id if client.rec_type == "recheme" else str(room_id)
+            )
+        audit_journal.record(
+            current_user, f"room.{request.action}", result is not None, time.monotonic() - start,
+            recType=client.rec_type, recName=client.name, roomId=room_id,
+            error=None if result is not None else f"{operation}失败"
+        )
+        if result is None:
+            return dict(outcome, success=False, error=f"{operation}失败")
+        return dict(outcome, success=True, result=result)
+
+    results = list(await asyncio.gather(*(dispatch(client, room_id) for client, room_id in targets)))
+    for client in {id(client): client for client, _ in targets}.values():
+        room_aggregator.invalidate(client)
+
+    if wanted is not None:
+        found = {result["roomId"] for result in results}
+        results.extend(
+            {"roomId": room_id, "success": False, "error": "未找到该直播间"}
+            for room_id in request.roomIds if room_id not in found
+        )
+
+    succeeded = sum(1 for result in results if result["success"])
+    logger.info(f"[API] 用户 {current_user} 批量{operation}，成功 {succeeded} 个，失败 {len(results) - succeeded} 个")
+    return {
+        "action": request.action,
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "data": results
+    }
+
+@app.post("/api/rebalance")
+@requires_auth
+async def rebalance_rooms(
+    request: RebalanceRequest,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    按负载在录播机之间迁移直播间
+    dryRun 为 true 时只返回迁移计划
+    """
+    logger.debug(f"[API] 用户 {current_user} 请求迁移直播间{'(预览)' if request.dryRun else ''}")
+    if request.recType and request.recType not in ["recheme", "blrec"]:
+        raise HTTPException(status_code=400, detail="不支持的录播类型")
+
+    loads = await get_recorder_loads(request.recType)
+    rooms = {(load.rec_type, load.rec_name): state_store.recorder_rooms(load.rec_type, load.rec_name) for load in loads}
+    moves = plan_moves(
+        loads,
+        rooms,
+        placement_engine.policy,
+        max_moves=request.maxMoves,
+        include_recording=request.includeRecording
+    )
+    loads_info = [load.to_dict() for load in loads]
+
+    if request.dryRun or not moves:
+        return {"dryRun": request.dryRun, "total": len(moves), "moves": moves, "loads": loads_info}
+
+    operation = rebalancer.create_operation(moves, current_user)
+    task = asyncio.create_task(rebalancer.execute(operation, request.rollback))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return dict(operation.progress(), dryRun=False, loads=loads_info)
+
+@app.get("/api/rebalance/{operationId}")
+async def get_rebalance_progress(operationId: str):
+    """获取迁移进度"""
+    operation = rebalancer.operations.get(operationId)
+    if not operation:
+        raise HTTPException(status_code=404, detail="迁移操作不存在")
+    return operation.progress()
+
+@audited("server.add")
 async def _add_single_server(request: AddServerRequest, save_immediately: bool = True, current_user: str = None) -> Dict:
     """添加单个录播机"""
     logger.debug(f"[API] {'用户 ' + current_user + ' ' if current_user else ''}请求添加新的录播机: {request.recName} ({request.recType})")
@@ -878,17 +1598,59 @@ async def get_recservers(
     return filtered_servers
 
 
+@app.get("/api/upstream")
+async def get_upstream_stats():
+    """获取各录播机地址的请求排队统计、延迟与当前超时，多线路录播机附带线路状态"""
+    stats = limiter_stats()
+    for host, endpoints in timeout_stats().items():
+        stats.setdefault(host, {"host": host})["endpoints"] = endpoints
+    for recorder, routes in replica_stats().items():
+        for host, route in routes.items():
+            stats.setdefault(host, {"host": host})["replica"] = {"recorder": recorder, **route}
+    return stats
+
+@app.get("/api/polling")
+async def get_polling_stats():
+    """获取后台轮询的当前间隔"""
+    if poll_scheduler is None:
+        return {"running": False}
+    return poll_scheduler.stats()
+
+@app.get("/api/upstream/attempts")
+async def get_upstream_attempts(limit: int = 100, host: str = None, failed: bool = False):
+    """获取最近的录播机请求尝试记录"""
+    return attempt_log.recent(min(max(limit, 1), 500), host, failed)
+
 @app.post("/api/server")
 @requires_auth
 async def add_server(
     request: Union[AddServerRequest, BatchAddServerRequest],
+    background: bool = False,
     current_user: str = Depends(get_current_user)
 ):
-    """添加录播机"""
+    """
+    添加录播机
+    批量添加且 background 为 true 时提交为后台任务，立即返回任务ID
+    """
     logger.debug(f"[API] 用户 {current_user} 请求添加录播机")
     
     if hasattr(request, "servers") and request.servers:
         logger.debug(f"[API] 批量添加请求，共 {len(request.servers)} 个录播机")
+
+        if background:
+            async def save_servers(job):
+                if not save_config(config):
+                    logger.error("[API] 保存配置文件失败")
+
+            job = job_manager.submit(
+                "server_add",
+                request.servers,
+                lambda server_req: _add_single_server(server_req, False, current_user),
+                current_user,
+                on_finish=save_servers
+            )
+            return job.progress(include_items=False)
+
         all_results = []
         failed_servers = []
         
@@ -936,10 +1698,27 @@ async def delete_server(
 @requires_auth
 async def batch_delete_servers(
     request: BatchDeleteServerRequest,
+    background: bool = False,
     current_user: str = Depends(get_current_user)
 ):
-    """批量删除录播机"""
+    """
+    批量删除录播机
+    background 为 true 时提交为后台任务，立即返回任务ID
+    """
     logger.debug(f"[API] 用户 {current_user} 请求批量删除录播机服务器，共 {len(request.servers)} 个")
+
+    if background:
+        job = job_manager.submit(
+            "server_delete",
+            request.servers,
+            lambda server_request: _delete_single_server(
+                server_request.recName,
+                server_request.recType,
+                current_user
+            ),
+            current_user
+        )
+        return job.progress(include_items=False)
     
     all_results = []
     failed_servers = []
@@ -975,6 +1754,7 @@ async def batch_delete_servers(
         "errors": failed_servers if failed_servers else None
     }
 
+@audited("server.delete")
 async def _delete_single_server(recName: str, recType: str, current_user: str = None):
     """删除单个录播机"""
     if not recName:
@@ -996,6 +1776,8 @@ async def _delete_single_server(recName: str, recType: str, current_user: str =
         else:
             del config["BLREC"][recName]
             logger.info(f"[API] 删除BLREC服务器 {recName} 成功")
+        state_store.remove_recorder(recType, recName)
+        room_aggregator.remove_recorder(recType, recName)
         
         save_config(config)
         
@@ -1011,6 +1793,119 @@ async def _delete_single_server(recName: str, recType: str, current_user: str =
         logger.error(f"[API] 删除录播机 {recName} 失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"删除录播机失败: {str(e)}")
 
+def build_log_filter(level: str = None, keyword: str = None, recName: str = None, roomId: int = None,
+                     since: datetime = None, until: datetime = None) -> LogFilter:
+    """根据查询参数生成日志筛选条件"""
+    if log_index is None:
+        raise HTTPException(status_code=404, detail="日志未写入文件")
+    levels = [item.strip().upper() for item in level.split(",") if item.strip()] if level else None
+    if levels and any(item not in LEVELS for item in levels):
+        raise HTTPException(status_code=400, detail=f"不支持的日志等级，必须是 {' / '.join(LEVELS)}")
+    keywords = [item for item in [keyword, recName, str(roomId) if roomId else None] if item]
+    # 日志时间为本地时间，带时区的参数转换为本地时间
+    since, until = [
+        value.astimezone().replace(tzinfo=None) if value is not None and value.tzinfo else value
+        for value in (since, until)
+    ]
+    return LogFilter(since, until, levels, keywords)
+
+@app.get("/api/logs")
+@requires_auth
+async def search_logs(
+    since: datetime = None,
+    until: datetime = None,
+    level: str = None,
+    keyword: str = None,
+    recName: str = None,
+    roomId: int = None,
+    limit: int = 200,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    查询日志，返回最近的匹配日志
+    :param since: 开始时间，不指定时为一天前
+    :param level: 日志等级，逗号分隔，如 ERROR,WARNING
+    :param keyword: 关键字，如 [录播姬]、[BLREC]
+    """
+    if since is None:
+        since = datetime.now() - timedelta(days=1)
+    log_filter = build_log_filter(level, keyword, recName, roomId, since, until)
+    return await asyncio.to_thread(log_index.search, log_filter, min(max(limit, 1), 5000))
+
+@app.get("/api/logs/tail")
+@requires_auth
+async def tail_logs(
+    level: str = None,
+    keyword: str = None,
+    recName: str = None,
+    roomId: int = None,
+    current_user: str = Depends(get_current_user)
+):
+    """以 SSE 推送新写入的日志"""
+    log_filter = build_log_filter(level, keyword, recName, roomId)
+    return StreamingResponse(log_index.tail(log_filter), media_type="text/event-stream")
+
+@app.get("/api/audit")
+@requires_auth
+async def query_audit(
+    since: datetime = None,
+    until: datetime = None,
+    user: str = None,
+    action: str = None,
+    recName: str = None,
+    roomId: int = None,
+    limit: int = 200,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    查询操作审计日志，按时间从新到旧
+    :param action: 操作类型，如 room.create / room.delete / room.start / server.add
+    """
+    if not audit_journal.enabled:
+        raise HTTPException(status_code=404, detail="审计日志未启用")
+    since, until = [
+        value.astimezone().replace(tzinfo=None) if value is not None and value.tzinfo else value
+        for value in (since, until)
+    ]
+    return await asyncio.to_thread(
+        audit_journal.query, since, until, user, action, recName, roomId, min(max(limit, 1), 5000)
+    )
+
+@app.get("/api/job")
+async def get_jobs():
+    """获取所有后台任务"""
+    return job_manager.summaries()
+
+@app.get("/api/job/{jobId}")
+async def get_job(jobId: str):
+    """获取后台任务进度及每项结果"""
+    job = job_manager.get(jobId)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job.progress()
+
+@app.get("/api/job/{jobId}/stream")
+async def stream_job(jobId: str):
+    """以 SSE 推送后台任务进度"""
+    job = job_manager.get(jobId)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return StreamingResponse(job_manager.stream(job), media_type="text/event-stream")
+
+@app.delete("/api/job/{jobId}")
+@requires_auth
+async def cancel_job(
+    jobId: str,
+    current_user: str = Depends(get_current_user)
+):
+    """取消后台任务"""
+    logger.debug(f"[API] 用户 {current_user} 请求取消任务 {jobId}")
+    if not job_manager.get(jobId):
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if not job_manager.cancel(jobId):
+        raise HTTPException(status_code=400, detail="任务已结束")
+    return job_manager.get(jobId).progress(include_items=False)
+
 @app.get("/api/login")
 async def check_auth_status():
     """
@@ -1047,6 +1942,18 @@ async def login(request: LoginRequest):
         detail="用户名或密码错误"
     )
 
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    """存活检查"""
+    return {"status": "ok"}
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    """就绪检查，启动预热完成前返回 503"""
+    if not ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready", "updatedAt": state_store.summary()["updatedAt"]}
+
 @app.get("/favicon.ico", include_in_schema=False)
 async def favicon_ico():
     return FileResponse("web/favicon.ico")